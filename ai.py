@@ -0,0 +1,168 @@
+"""
+Every model call goes through here, on one process-wide OpenAI client.
+
+The client owns a tuned httpx pool: keep-alive connections are reused
+across reruns, sessions and threads, so back-to-back or concurrent
+generations skip the TCP+TLS handshake. HTTP/2 is used when the `h2`
+package is installed.
+"""
+import json
+import threading
+
+from perf import lazy_import
+
+MODEL = "gpt-4o-mini"
+
+# Seconds. Connecting should be quick; generating long answers is not.
+CONNECT_TIMEOUT = 10.0
+READ_TIMEOUT = 180.0
+WRITE_TIMEOUT = 30.0
+POOL_TIMEOUT = 10.0
+
+MAX_CONNECTIONS = 20
+MAX_KEEPALIVE_CONNECTIONS = 10
+KEEPALIVE_EXPIRY = 120.0  # idle seconds before a pooled connection is closed
+
+MAX_RETRIES = 2
+
+_client_lock = threading.Lock()
+_client = None
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def get_client():
+    """The shared OpenAI client (created on first use; reads OPENAI_API_KEY)."""
+    global _client
+    if _client is not None:
+        return _client
+
+    with _client_lock:
+        if _client is None:
+            httpx = lazy_import("httpx")
+            openai = lazy_import("openai")
+
+            timeout = httpx.Timeout(
+                READ_TIMEOUT, connect=CONNECT_TIMEOUT, write=WRITE_TIMEOUT, pool=POOL_TIMEOUT,
+            )
+            http_client = httpx.Client(
+                http2=_http2_available(),
+                timeout=timeout,
+                limits=httpx.Limits(
+                    max_connections=MAX_CONNECTIONS,
+                    max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=KEEPALIVE_EXPIRY,
+                ),
+            )
+            _client = openai.OpenAI(http_client=http_client, timeout=timeout, max_retries=MAX_RETRIES)
+    return _client
+
+
+# -------------------------
+# Question generator
+# -------------------------
+def generate_questions_from_notes(topic: str, notes: str, n_mcq: int, n_short: int,
+                                  paragraphs=None):
+    """
+    Generate a question pack from `notes`. If `paragraphs` (list of str) is
+    given, only those are sent, numbered, and every question comes back with
+    "source": the index of the paragraph it was written from.
+    """
+    schema = {
+        "name": "question_pack",
+        "schema": {
+            "type": "object",
+            "properties": {
+                "questions": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "q_type": {"type": "string", "enum": ["MCQ", "Short Answer"]},
+                            "question": {"type": "string"},
+                            "answer": {"type": "string"},
+                            "choices": {"type": "array", "items": {"type": "string"}},
+                            "correct_choice_index": {"type": "integer", "minimum": 0, "maximum": 3},
+                        },
+                        "required": ["q_type", "question", "answer", "choices", "correct_choice_index"],
+                        "additionalProperties": False,
+                    },
+                }
+            },
+            "required": ["questions"],
+            "additionalProperties": False,
+        },
+    }
+
+    source_rule = ""
+    if paragraphs:
+        item = schema["schema"]["properties"]["questions"]["items"]
+        item["properties"]["source"] = {"type": "integer", "minimum": 1, "maximum": len(paragraphs)}
+        item["required"].append("source")
+        notes = "\n\n".join(f"[P{i}] {p}" for i, p in enumerate(paragraphs, start=1))
+        source_rule = "4) source MUST be the number of the [P#] paragraph the question is based on.\n"
+
+    # 🔥 Upgraded prompt for high-quality, memorable answers
+    prompt = f"""
+You are an MBBS final-year exam tutor and question writer.
+
+ONLY use information found in the notes. Do NOT invent facts.
+If a detail is missing in the notes, write: "Not in notes."
+
+Topic: {topic}
+
+Return JSON that matches the schema exactly.
+
+You must generate:
+- {n_mcq} MCQs
+- {n_short} Short Answer questions
+
+Formatting rules (IMPORTANT):
+1) For EVERY question object, ALWAYS include: q_type, question, answer, choices, correct_choice_index.
+2) MCQ:
+   - choices MUST have exactly 4 options.
+   - correct_choice_index MUST be 0-3.
+   - answer MUST be LONG and include all of:
+     - "Correct: <A/B/C/D> — <correct option text>"
+     - "Explanation:" (high-yield, step-by-step)
+     - "Why others are wrong:" (1 line per option)
+     - "Memory hook / mnemonic:" (short but sticky)
+     - "Exam trap:" (common confusion)
+3) Short Answer:
+   - choices MUST be [] and correct_choice_index MUST be 0.
+   - answer MUST be LONG and include all of:
+     - "Core answer:" (direct exam-style)
+     - "Explanation:" (breakdown from the notes)
+     - "Memory hook:" (sticky recall)
+     - "Exam trap:" (common mistake)
+     - "Mini self-check:" (1 quick question to test recall)
+{source_rule}
+Notes:
+{notes}
+""".strip()
+
+    resp = get_client().responses.create(
+        model=MODEL,
+        input=prompt,
+        text={
+            "format": {
+                "type": "json_schema",
+                "name": "question_pack",
+                "strict": True,
+                "schema": schema["schema"],
+            }
+        },
+    )
+
+    data = json.loads(resp.output_text)
+    questions = data["questions"]
+    if paragraphs:
+        for q in questions:
+            q["source"] = min(max(int(q.get("source", 1)), 1), len(paragraphs)) - 1
+    return questions
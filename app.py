@@ -1,7 +1,6 @@
 
 import textwrap  # add this near the top with imports
 import streamlit as st
-import pandas as pd
 import os
 import base64
 from pathlib import Path
@@ -10,11 +9,13 @@ from datetime import date
 # -------------------------
 # DB imports (your db.py)
 # -------------------------
-from db import init_db
+from db import init_db, init_home_tables
+from ui import bind_user, query_diagnostics
 
 PROFILE_OK = True
 QUESTIONS_OK = True
 TRACKER_OK = True
+TODOS_OK = True
 
 try:
     from db import get_profile
@@ -22,15 +23,20 @@ except Exception:
     PROFILE_OK = False
 
 try:
-    from db import get_questions
+    from db import get_question_count
 except Exception:
     QUESTIONS_OK = False
 
 try:
-    from db import get_today_sessions
+    from db import get_today_sessions, get_streak
 except Exception:
     TRACKER_OK = False
 
+try:
+    from db import get_todos, apply_todo_changes, carry_over_todos, count_open_todos_before
+except Exception:
+    TODOS_OK = False
+
 
 # -------------------------
 # Page config
@@ -44,7 +50,10 @@ st.set_page_config(
 # -------------------------
 # Init DB
 # -------------------------
+bind_user()
 init_db()
+init_home_tables()
+query_diagnostics()
 
 # -------------------------
 # Helpers
@@ -77,92 +86,6 @@ def minutes_to_pretty(m):
         return f"{m:.1f} min"
     return f"{m/60:.1f} hrs"
 
-# =========================
-# DAILY TASKS (Checklist)
-# =========================
-import sqlite3
-from datetime import date, datetime
-
-# If you already have DB_PATH or a get_connection() function, reuse it.
-# Below tries to be compatible with most db.py styles.
-
-def _get_conn():
-    # If you already defined DB_PATH earlier, this will use it.
-    # Otherwise, fallback to "mbbs.db" (change if your DB name is different).
-    db_path = globals().get("DB_PATH", "mbbs.db")
-    return sqlite3.connect(db_path, check_same_thread=False)
-
-
-def init_daily_tasks_table():
-    with _get_conn() as conn:
-        conn.execute("""
-        CREATE TABLE IF NOT EXISTS daily_tasks (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            task_date TEXT NOT NULL,
-            task_text TEXT NOT NULL,
-            is_done INTEGER NOT NULL DEFAULT 0,
-            created_at TEXT NOT NULL
-        );
-        """)
-        conn.execute("CREATE INDEX IF NOT EXISTS idx_daily_tasks_date ON daily_tasks(task_date);")
-        conn.commit()
-
-
-def add_daily_task(task_text: str, task_date: str = None):
-    task_text = (task_text or "").strip()
-    if not task_text:
-        return
-
-    if task_date is None:
-        task_date = date.today().isoformat()
-
-    with _get_conn() as conn:
-        conn.execute("""
-        INSERT INTO daily_tasks (task_date, task_text, is_done, created_at)
-        VALUES (?, ?, 0, ?)
-        """, (task_date, task_text, datetime.now().isoformat(timespec="seconds")))
-        conn.commit()
-
-
-def get_daily_tasks(task_date: str = None):
-    if task_date is None:
-        task_date = date.today().isoformat()
-
-    with _get_conn() as conn:
-        rows = conn.execute("""
-        SELECT id, task_text, is_done
-        FROM daily_tasks
-        WHERE task_date = ?
-        ORDER BY id DESC
-        """, (task_date,)).fetchall()
-
-    # returns list of tuples: (id, text, is_done)
-    return rows
-
-
-def set_task_done(task_id: int, is_done: bool):
-    with _get_conn() as conn:
-        conn.execute("""
-        UPDATE daily_tasks
-        SET is_done = ?
-        WHERE id = ?
-        """, (1 if is_done else 0, int(task_id)))
-        conn.commit()
-
-
-def clear_completed_tasks(task_date: str = None):
-    if task_date is None:
-        task_date = date.today().isoformat()
-
-    with _get_conn() as conn:
-        conn.execute("""
-        DELETE FROM daily_tasks
-        WHERE task_date = ? AND is_done = 1
-        """, (task_date,))
-        conn.commit()
-
-
-
 # -------------------------
 # Cute Pink Theme CSS
 # -------------------------
@@ -308,12 +231,24 @@ if TRACKER_OK:
     try:
         today_rows = get_today_sessions() or []
         if today_rows:
-            df_today = pd.DataFrame(today_rows, columns=["Activity", "Start", "End", "Minutes"])
-            today_total = float(df_today["Minutes"].sum())
-            by_act = df_today.groupby("Activity")["Minutes"].sum().sort_values(ascending=False)
-            if len(by_act) > 0:
-                top_activity = str(by_act.index[0])
-                top_minutes = float(by_act.iloc[0])
+            today_total = float(sum(r[3] for r in today_rows))
+            by_act = {}
+            for act, _start, _end, minutes in today_rows:
+                by_act[act] = by_act.get(act, 0.0) + minutes
+            top_activity, top_minutes = max(by_act.items(), key=lambda kv: kv[1])
+            top_activity, top_minutes = str(top_activity), float(top_minutes)
+    except Exception:
+        pass
+
+# -------------------------
+# Study streak
+# -------------------------
+streak_current = 0
+streak_longest = 0
+
+if TRACKER_OK:
+    try:
+        streak_current, streak_longest = get_streak()
     except Exception:
         pass
 
@@ -323,7 +258,7 @@ if TRACKER_OK:
 q_total = 0
 if QUESTIONS_OK:
     try:
-        q_total = len(get_questions(None) or [])
+        q_total = get_question_count()
     except Exception:
         pass
 
@@ -406,11 +341,11 @@ with c1:
     """, unsafe_allow_html=True)
 
 with c2:
-    st.markdown("""
+    st.markdown(f"""
     <div class="pink-card">
       <div class="badge">Study Streak</div>
-      <div style="margin-top:10px; font-weight:800; font-size:22px;">1 💖</div>
-      <div style="color: rgba(60,40,50,0.7); font-weight:700;">days in a row</div>
+      <div style="margin-top:10px; font-weight:800; font-size:22px;">{streak_current} 💖</div>
+      <div style="color: rgba(60,40,50,0.7); font-weight:700;">days in a row · best {streak_longest}</div>
     </div>
     """, unsafe_allow_html=True)
 
@@ -472,7 +407,55 @@ st.divider()
 st.markdown("## 📌 Today’s Log (preview)")
 
 if TRACKER_OK and today_rows:
-    df_today = pd.DataFrame(today_rows, columns=["Activity", "Start", "End", "Minutes"])
-    st.dataframe(df_today, use_container_width=True, hide_index=True)
+    cols = ["Activity", "Start", "End", "Minutes"]
+    st.dataframe([dict(zip(cols, r)) for r in today_rows], use_container_width=True, hide_index=True)
 else:
     st.info("No sessions logged today yet. Go to **Tracker** and start tracking 💖")
+
+st.write("")
+
+# -------------------------
+# Today's Tasks
+# -------------------------
+st.markdown("## ✅ Today’s Tasks")
+
+if TODOS_OK:
+    today_iso = date.today().isoformat()
+
+    # Unfinished tasks from earlier days move over in one statement.
+    left_over = count_open_todos_before(today_iso)
+    if left_over and st.button(f"↪️ Carry over {left_over} unfinished task(s) from earlier days"):
+        moved = carry_over_todos(today_iso)
+        st.toast(f"Moved {moved} task(s) to today", icon="↪️")
+        st.rerun()
+
+    todo_rows = get_todos(today_iso)  # [(id, task, done)]
+    # New key after each save so the editor starts from the saved rows.
+    editor_key = f"todos_{today_iso}_{st.session_state.get('todos_saved', 0)}"
+    st.data_editor(
+        [{"task": task, "done": bool(done)} for _, task, done in todo_rows],
+        key=editor_key,
+        num_rows="dynamic",
+        hide_index=True,
+        width="stretch",
+        column_config={
+            "task": st.column_config.TextColumn("Task", required=True),
+            "done": st.column_config.CheckboxColumn("Done", default=False),
+        },
+    )
+
+    # The editor reports a diff: {"edited_rows": {row: {col: value}},
+    # "added_rows": [{col: value}], "deleted_rows": [row]}.
+    changes = st.session_state.get(editor_key) or {}
+    edited = [
+        (todo_rows[int(i)][0], c.get("task", todo_rows[int(i)][1]), c.get("done", todo_rows[int(i)][2]))
+        for i, c in changes.get("edited_rows", {}).items()
+    ]
+    added = [(r.get("task"), r.get("done", False)) for r in changes.get("added_rows", [])]
+    deleted = [todo_rows[int(i)][0] for i in changes.get("deleted_rows", [])]
+    pending = len(edited) + len(added) + len(deleted)
+
+    if st.button(f"💾 Save {pending} change(s)", type="primary", disabled=not pending):
+        apply_todo_changes(today_iso, added=added, edited=edited, deleted=deleted)
+        st.session_state.todos_saved = st.session_state.get("todos_saved", 0) + 1
+        st.rerun()
@@ -0,0 +1,12 @@
+"""
+Benchmarks for the db.py hot paths and the pages' data loading.
+
+    python -m bench.run                      # small preset, prints a table
+    python -m bench.run --preset large -o bench_report.json
+    python -m bench.run --baseline old_report.json
+
+See bench/generate.py for the synthetic data and bench/thresholds.json
+for the latency budgets that make a run fail. Every case needs a budget in
+each preset: 3x its slowest cold median over a few runs (at least 1 ms),
+rounded up to two significant digits. A new case without one fails the run.
+"""
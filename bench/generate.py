@@ -0,0 +1,96 @@
+"""Build a synthetic Lazy Genius database at a configurable scale."""
+import random
+from datetime import date, datetime, timedelta
+
+import db
+
+ACTIVITIES = ["Study 📚", "Ward 🏥", "Lecture 🧑‍🏫", "Break ☕", "Sleep 😴"]
+TOPICS = [
+    "Cardiology", "Respiratory", "Nephrology", "Endocrinology", "Gastroenterology",
+    "Neurology", "Psychiatry", "Paediatrics", "Obstetrics", "Gynaecology",
+    "General Surgery", "Orthopaedics", "Urology", "ENT", "Ophthalmology",
+    "Dermatology", "Haematology", "Oncology", "Infectious Disease", "Rheumatology",
+    "Pharmacology", "Pathology", "Microbiology", "Public Health", "Emergency Medicine",
+]
+WORDS = (
+    "patient presents with acute chest pain radiating to left arm diaphoresis "
+    "troponin elevated ecg shows st elevation inferior leads management includes "
+    "aspirin clopidogrel heparin primary pci within ninety minutes contraindications "
+    "bleeding risk renal function monitor potassium magnesium beta blocker statin "
+    "ace inhibitor secondary prevention lifestyle smoking cessation diabetes control"
+).split()
+
+PRESETS = {
+    "small": {"sessions": 100_000, "questions": 10_000},
+    "large": {"sessions": 1_000_000, "questions": 100_000},
+}
+
+
+def _words(rng, n):
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+
+def _answer(rng, answer_words):
+    part = max(1, answer_words // 5)
+    return "\n".join([
+        f"Core answer: {_words(rng, part)}",
+        f"Explanation: {_words(rng, part)}",
+        f"Memory hook: {_words(rng, part)}",
+        f"Exam trap: {_words(rng, part)}",
+        f"Mini self-check: {_words(rng, part)}?",
+    ])
+
+
+def session_rows(n, years=3, seed=1):
+    """n sessions spread evenly over the last `years` years, oldest first."""
+    rng = random.Random(seed)
+    span = timedelta(days=365 * years).total_seconds()
+    start = datetime.combine(date.today(), datetime.min.time()) - timedelta(days=365 * years)
+    step = span / max(n, 1)
+    for i in range(n):
+        s = start + timedelta(seconds=i * step)
+        e = s + timedelta(minutes=rng.randint(5, 120))
+        yield (rng.choice(ACTIVITIES), s.isoformat(timespec="seconds"),
+               e.isoformat(timespec="seconds"), (e - s).total_seconds() / 60.0)
+
+
+def question_rows(n, answer_words=300, seed=2):
+    rng = random.Random(seed)
+    now = datetime.now()
+    for i in range(n):
+        created = now - timedelta(minutes=n - i)
+        yield (
+            rng.choice(TOPICS),
+            rng.choice(["MCQ", "Short Answer"]),
+            _words(rng, 25) + "?",
+            _answer(rng, answer_words),
+            created.isoformat(timespec="seconds"),
+            rng.randint(0, 5),
+            rng.randint(0, 5),
+        )
+
+
+def todo_rows(days=365, per_day=5, seed=3):
+    rng = random.Random(seed)
+    today = date.today()
+    for d in range(days):
+        day = (today - timedelta(days=d)).isoformat()
+        for _ in range(per_day):
+            yield (day, _words(rng, 6), rng.randint(0, 1), day + "T08:00:00")
+
+
+def generate(path, sessions, questions, answer_words=300, years=3):
+    """Point db at a fresh file `path` and fill it."""
+    db.DB_NAME = str(path)
+    db.clear_cache()
+    db.migrate()
+
+    db.insert_many("sessions", session_rows(sessions, years))
+    db.insert_many("questions", question_rows(questions, answer_words))
+    db.insert_many("todos", todo_rows())
+    db.insert_many("settings", [("daily_goal", "120"), ("exam_date", date.today().isoformat())])
+    db.update_profile(full_name="Bench Student", nickname="Bench")
+    # Start timing from a settled file, not a WAL full of freshly loaded pages.
+    with db.connection() as conn:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    db.clear_cache()
@@ -0,0 +1,282 @@
+"""
+Time every db.py function and the pages' data-loading paths against a
+synthetic database, emit a JSON report and fail on regressions.
+
+Each case is timed "cold" (db cache cleared first, so SQLite is hit) and
+"warm" (straight after, served from the read cache). Budgets in
+thresholds.json apply to the cold median.
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from itertools import islice
+from pathlib import Path
+
+import db
+import related
+from bench.generate import ACTIVITIES, PRESETS, TOPICS, generate
+
+THRESHOLDS_FILE = Path(__file__).with_name("thresholds.json")
+
+
+# -------------------------
+# Page-level loading paths (what each page reads per rerun)
+# -------------------------
+def _totals_by_activity(rows):
+    totals = {}
+    for act, _start, _end, minutes in rows:
+        totals[act] = totals.get(act, 0.0) + minutes
+    return totals
+
+
+def page_home():
+    db.get_profile()
+    _totals_by_activity(db.get_today_sessions())
+    db.get_streak()
+    db.get_question_count()
+    db.count_open_todos_before(date.today().isoformat())
+    db.get_todos(date.today().isoformat())
+
+
+def page_tracker():
+    _totals_by_activity(db.get_today_sessions())
+
+
+def page_analytics(days=7):
+    import pandas as pd
+    from heatmap import daily_array, year_grid, year_html
+
+    today = date.today()
+    db.get_activities()
+    start = date(today.year - 2, 1, 1)
+    values = daily_array(db.get_daily_totals(start, today), start, today)
+    for y in range(start.year, today.year + 1):
+        year_html(year_grid(values, start, y), y)
+
+    start = today - timedelta(days=days - 1)
+    bucket = "day" if days <= 92 else "week" if days <= 731 else "month"
+    if db.get_activity_totals(start, today):
+        trend = pd.Series(dict(db.get_bucket_totals(start, today, bucket)), dtype=float)
+        trend.index = pd.to_datetime(trend.index)
+        db.get_session_page(limit=51, start_date=start.isoformat(), end_date=today.isoformat())
+
+
+def page_questions():
+    rows = db.get_questions(None, limit=20)
+    cols = ["ID", "Topic", "Type", "Question", "Created", "Correct", "Wrong"]
+    [dict(zip(cols, r)) for r in rows]
+    db.get_weakest_topics(limit=5)
+    db.get_topics()
+    db.get_questions(TOPICS[0])
+
+
+def page_history():
+    db.get_activities()
+    db.get_session_page(limit=51)
+
+
+def page_profile():
+    db.get_profile()
+
+
+# -------------------------
+# Cases
+# -------------------------
+def read_cases():
+    today = date.today()
+    return {
+        "get_today_sessions": db.get_today_sessions,
+        "get_sessions_between:7d": lambda: db.get_sessions_between(today - timedelta(days=6), today),
+        "get_sessions_between:365d": lambda: db.get_sessions_between(today - timedelta(days=364), today),
+        "get_session_page": lambda: db.get_session_page(limit=51),
+        "get_session_page:deep": lambda: db.get_session_page(before=("2000-01-01T00:00:00", 0), limit=51),
+        "get_session_page:activity": lambda: db.get_session_page(limit=51, activity=ACTIVITIES[0],
+                                                                 start_date=today - timedelta(days=90)),
+        "get_questions:all": lambda: db.get_questions(None),
+        "get_questions:topic": lambda: db.get_questions(TOPICS[0]),
+        "get_questions:latest20": lambda: db.get_questions(None, limit=20),
+        "get_answer": lambda: db.get_answer(1),
+        "get_answer_key": lambda: db.get_answer_key(1),
+        "get_term_df": lambda: db.get_term_df(["heart", "failure", "renal", "drug", "dose"]),
+        "get_question_weights": lambda: db.get_question_weights(None),
+        "get_cards:50": lambda: db.get_cards(range(1, 51)),
+        "iter_question_texts:1000": lambda: list(islice(db.iter_question_texts(), 1000)),
+        "related": lambda: related.get_index().related(1, k=5),
+        "get_topics": db.get_topics,
+        "get_topic_stats": db.get_topic_stats,
+        "get_weakest_topics": lambda: db.get_weakest_topics(limit=5),
+        "get_question_count": db.get_question_count,
+        "get_setting": lambda: db.get_setting("daily_goal"),
+        "get_todos": lambda: db.get_todos(today.isoformat()),
+        "count_open_todos_before": lambda: db.count_open_todos_before(today.isoformat()),
+        "get_active_days": db.get_active_days,
+        "get_minutes_for_date": lambda: db.get_minutes_for_date(today.isoformat()),
+        "get_daily_totals:3y": lambda: db.get_daily_totals(date(today.year - 2, 1, 1), today),
+        "get_bucket_totals:3y:week": lambda: db.get_bucket_totals(date(today.year - 2, 1, 1), today, "week"),
+        "get_bucket_totals:3y:month": lambda: db.get_bucket_totals(date(today.year - 2, 1, 1), today, "month"),
+        "get_activity_totals:365d": lambda: db.get_activity_totals(today - timedelta(days=364), today),
+        "get_activities": db.get_activities,
+        "get_streak": db.get_streak,
+        "get_profile": db.get_profile,
+        "iter_rows:settings": lambda: list(db.iter_rows("settings")),
+        "page:home": page_home,
+        "page:tracker": page_tracker,
+        "page:analytics": page_analytics,
+        "page:analytics:365d": lambda: page_analytics(days=365),
+        "page:questions": page_questions,
+        "page:history": page_history,
+        "page:profile": page_profile,
+    }
+
+
+def write_cases():
+    now = datetime.now()
+    today = date.today().isoformat()
+    return {
+        "save_session": lambda: db.save_session(ACTIVITIES[0], now - timedelta(minutes=25), now),
+        "apply_session_changes": lambda: db.apply_session_changes(
+            edited=[(1, ACTIVITIES[0], now - timedelta(minutes=25), now)]),
+        "add_question": lambda: db.add_question(TOPICS[0], "MCQ", "Bench question?", "Core answer: bench"),
+        "mark_answer": lambda: db.mark_answer(1, False),
+        "mark_answers:50": lambda: db.mark_answers((q, q % 2 == 0) for q in range(1, 51)),
+        "set_setting": lambda: db.set_setting("bench", "1"),
+        "add_todo": lambda: db.add_todo(today, "bench task"),
+        "set_todo_done": lambda: db.set_todo_done(1, True),
+        "delete_todo": lambda: db.delete_todo(10**9),
+        "clear_completed_todos": lambda: db.clear_completed_todos("1900-01-01"),
+        "apply_todo_changes:20": lambda: db.apply_todo_changes(
+            today, added=[(f"bench task {i}", False) for i in range(10)],
+            edited=[(i, f"bench edit {i}", i % 2) for i in range(1, 11)]),
+        "carry_over_todos": lambda: db.carry_over_todos("1900-01-01"),
+        "update_profile": lambda: db.update_profile(full_name="Bench Student", nickname="Bench"),
+        "insert_many:settings": lambda: db.insert_many("settings", [("bench", "2")]),
+    }
+
+
+def _median_ms(fn, repeat, cold):
+    times = []
+    for _ in range(repeat):
+        if cold:
+            db.clear_cache()
+        t = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t) * 1000)
+    return statistics.median(times)
+
+
+def run_cases(repeat):
+    results = {}
+    for name, fn in read_cases().items():
+        results[name] = {
+            "cold_ms": round(_median_ms(fn, repeat, cold=True), 3),
+            "warm_ms": round(_median_ms(fn, repeat, cold=False), 3),
+        }
+    for name, fn in write_cases().items():
+        results[name] = {"cold_ms": round(_median_ms(fn, repeat, cold=True), 3)}
+    return results
+
+
+def check(results, budgets, baseline=None, tolerance=1.5, require_budgets=False):
+    """Return a list of human-readable failures."""
+    failures = []
+    if require_budgets:
+        # A case without a budget would otherwise never fail.
+        failures += [f"{name}: no budget in {THRESHOLDS_FILE.name}" for name in results if name not in budgets]
+        failures += [f"{name}: budget for a case that no longer exists" for name in budgets if name not in results]
+
+    for name, limit in budgets.items():
+        got = results.get(name, {}).get("cold_ms")
+        if got is not None and got > limit:
+            failures.append(f"{name}: {got:.2f} ms > budget {limit:.2f} ms")
+
+    for name, old in (baseline or {}).items():
+        got = results.get(name, {}).get("cold_ms")
+        # Ignore timer noise on the fast cases.
+        if got is not None and got > max(old["cold_ms"] * tolerance, old["cold_ms"] + 2.0):
+            failures.append(f"{name}: {got:.2f} ms vs baseline {old['cold_ms']:.2f} ms")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark db.py and page data loading.")
+    parser.add_argument("--preset", choices=list(PRESETS), default="small")
+    parser.add_argument("--sessions", type=int, help="override the preset's session count")
+    parser.add_argument("--questions", type=int, help="override the preset's question count")
+    parser.add_argument("--answer-words", type=int, default=300, help="words per generated answer")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--db", help="reuse/keep this database file instead of a temp one")
+    parser.add_argument("-o", "--output", help="write the JSON report here")
+    parser.add_argument("--baseline", help="earlier JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="allowed slowdown vs baseline")
+    args = parser.parse_args(argv)
+
+    scale = dict(PRESETS[args.preset])
+    custom = args.sessions is not None or args.questions is not None
+    if args.sessions is not None:
+        scale["sessions"] = args.sessions
+    if args.questions is not None:
+        scale["questions"] = args.questions
+
+    tmp = None
+    path = args.db
+    if path is None:
+        tmp = tempfile.TemporaryDirectory()
+        path = os.path.join(tmp.name, "bench.db")
+
+    try:
+        t = time.perf_counter()
+        if not os.path.exists(path):
+            generate(path, scale["sessions"], scale["questions"], args.answer_words)
+        else:
+            db.DB_NAME = path
+            db.clear_cache()
+        generate_s = time.perf_counter() - t
+
+        results = run_cases(args.repeat)
+    finally:
+        if tmp is not None:
+            tmp.cleanup()
+
+    # Budgets only make sense for the preset sizes they were set for.
+    budgets = {} if custom else json.loads(THRESHOLDS_FILE.read_text()).get(args.preset, {})
+    baseline = json.loads(Path(args.baseline).read_text())["results"] if args.baseline else None
+    failures = check(results, budgets, baseline, args.tolerance, require_budgets=not custom)
+
+    report = {
+        "meta": {
+            "preset": None if custom else args.preset,
+            "scale": scale,
+            "answer_words": args.answer_words,
+            "repeat": args.repeat,
+            "generate_s": round(generate_s, 2),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+        },
+        "results": results,
+        "failures": failures,
+    }
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(text, encoding="utf-8")
+    else:
+        print(text)
+
+    for name, r in results.items():
+        warm = f"{r['warm_ms']:9.2f} ms" if "warm_ms" in r else ""
+        print(f"{name:32s} cold {r['cold_ms']:9.2f} ms   {warm}", file=sys.stderr)
+    for f in failures:
+        print("REGRESSION " + f, file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,18 @@
+# At the repo root so pytest puts the app modules on sys.path for tests/.
+import pytest
+
+import db
+
+
+@pytest.fixture
+def fresh_db(tmp_path, monkeypatch):
+    """An empty default database in a temp dir, with no user or cache left over."""
+    monkeypatch.chdir(tmp_path)
+    # Absolute paths: per-file state (pools, migrations) must not carry over.
+    monkeypatch.setattr(db, "DB_NAME", str(tmp_path / "test.db"))
+    monkeypatch.setattr(db, "USERS_DIR", str(tmp_path / "users"))
+    db.set_user(None)
+    db.clear_cache()
+    yield
+    db.set_user(None)
+    db.clear_cache()
@@ -1,19 +1,466 @@
+import contextvars
+import hashlib
+import logging
+import os
+import queue
+import re
 import sqlite3
-from datetime import datetime
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from functools import wraps
+from itertools import islice
+
+from nlp import answer_terms
 
 DB_NAME = "lazy_genius.db"
 
+# Old home-page checklist store (app.py used to keep daily_tasks here).
+LEGACY_TASKS_DB = "mbbs.db"
+
+# Max number of idle connections kept open for reuse.
+POOL_SIZE = 4
+
+# Rows per executemany/commit (bulk import) and per fetchmany (export).
+BULK_BATCH = 10_000
+
+# Max number of cached read results kept in memory per DB file (LRU).
+CACHE_SIZE = 256
+
+# Answers at least this long (UTF-8 bytes) are stored zlib-compressed.
+ANSWER_COMPRESS_MIN = 512
+
+# Multi-user: each student gets USERS_DIR/<user>.db. With no user set,
+# everything reads/writes DB_NAME (the original single-student file).
+USERS_DIR = "users"
+
+# Max number of DB files with pooled connections open at the same time.
+MAX_OPEN_DBS = 32
+
+# -------------------------
+# User context
+# -------------------------
+# Which student's file a call touches comes from a context variable, set once
+# per page rerun (ui.bind_user) or around a block (user_context). Threads
+# don't inherit it: background work must wrap itself in user_context.
+_user = contextvars.ContextVar("db_user", default=None)
+_USER_RE = re.compile(r"[a-z0-9][a-z0-9_.-]{0,63}")
+
+
+def normalize_user(user_id):
+    """Canonical user id (lowercase slug), or None for the single-student DB."""
+    user_id = (user_id or "").strip().lower()
+    if not user_id:
+        return None
+    if not _USER_RE.fullmatch(user_id):
+        raise ValueError("User id may only use letters, digits, '.', '_' and '-' (max 64).")
+    return user_id
+
+
+def set_user(user_id):
+    """Route this context's db calls to `user_id`'s database (None = default)."""
+    _user.set(normalize_user(user_id))
+
+
+def current_user():
+    return _user.get()
+
+
+@contextmanager
+def user_context(user_id):
+    """Temporarily act as `user_id` (e.g. inside a worker thread)."""
+    token = _user.set(normalize_user(user_id))
+    try:
+        yield
+    finally:
+        _user.reset(token)
+
+
+def db_path() -> str:
+    """The database file for the current user."""
+    user = _user.get()
+    if user is None:
+        return DB_NAME
+    return os.path.join(USERS_DIR, f"{user}.db")
+
+
+# -------------------------
+# Read-through cache
+# -------------------------
+# Every write bumps a per-table generation counter. Cached reads are keyed by
+# (function, args, generations of the tables they read), so a write makes the
+# old entries unreachable and they age out of the LRU.
+#
+# Other processes (transfer.py import, a second app) can't bump our counters.
+# Every commit also increments the write_stamp row; a watcher connection per
+# file notices foreign commits through PRAGMA data_version, and a stamp this
+# process didn't write bumps the file's epoch, which is part of every key.
+_cache_lock = threading.Lock()
+_generations = {}
+_cache = OrderedDict()  # DB file -> OrderedDict of key -> result, both LRU
+_epochs = {}  # DB file -> foreign writes noticed
+_stamps = {}  # DB file -> last write_stamp seen or written here
+_watchers = OrderedDict()  # DB file -> [connection, last data_version]
+
+
+def _foreign_write(path: str):
+    # Caller holds _cache_lock.
+    _epochs[path] = _epochs.get(path, 0) + 1
+    _reset_streak(path)
+
+
+def _check_foreign_writes(path: str):
+    """Bump `path`'s epoch if another process committed since we last looked."""
+    # Caller holds _cache_lock.
+    watcher = _watchers.get(path)
+    if watcher is None:
+        watcher = _watchers[path] = [sqlite3.connect(path, check_same_thread=False), None]
+        while len(_watchers) > MAX_OPEN_DBS:
+            _watchers.popitem(last=False)[1][0].close()
+    _watchers.move_to_end(path)
+
+    # Changes whenever any other connection commits; cheap, no table read.
+    version = watcher[0].execute("PRAGMA data_version").fetchone()[0]
+    if version == watcher[1]:
+        return
+    watcher[1] = version
+    stamp = watcher[0].execute("SELECT n FROM write_stamp").fetchone()[0]
+    if stamp != _stamps.get(path):
+        _stamps[path] = stamp
+        _foreign_write(path)
+
+
+def _commit(conn, path: str):
+    """Commit, counting it in write_stamp if anything was written."""
+    if not conn.in_transaction:
+        conn.commit()
+        return
+    stamp = conn.execute("UPDATE write_stamp SET n = n + 1 RETURNING n").fetchall()[0][0]
+    conn.commit()
+    with _cache_lock:
+        # Anything between our last stamp and this one came from elsewhere.
+        if _stamps.get(path) != stamp - 1:
+            _foreign_write(path)
+        _stamps[path] = max(stamp, _stamps.get(path, 0))
+
+
+def _bump(*tables):
+    """Invalidate every cached read that depends on one of these tables."""
+    with _cache_lock:
+        for t in tables:
+            _generations[db_path(), t] = _generations.get((db_path(), t), 0) + 1
+
+
+def _copy(value):
+    # Callers may mutate what they get back; never hand out the cached object.
+    if isinstance(value, list):
+        return list(value)
+    if isinstance(value, dict):
+        return dict(value)
+    return value
+
+
+def _cached(*tables):
+    """Cache a read function until one of `tables` is written to."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            # Snapshot generations BEFORE reading, so a concurrent write can
+            # only ever leave a result under an already-outdated key.
+            path = db_path()
+            migrate()
+            with _cache_lock:
+                _check_foreign_writes(path)
+                gens = (_epochs.get(path, 0),) + tuple(_generations.get((path, t), 0) for t in tables)
+                key = (fn.__name__, args, tuple(sorted(kwargs.items())), gens)
+                entries = _cache.get(path)
+                hit = entries is not None and key in entries
+                if hit:
+                    entries.move_to_end(key)
+                    value = entries[key]
+
+            stats = _query_stats.get()
+            if stats is not None:
+                if hit:
+                    stats.cache_hits += 1
+                else:
+                    stats.cache_misses += 1
+            if hit:
+                return _copy(value)
+
+            value = fn(*args, **kwargs)
+
+            with _cache_lock:
+                # Per file, so one busy student can't evict everyone else's reads.
+                entries = _cache.get(path)
+                if entries is None:
+                    entries = _cache[path] = OrderedDict()
+                _cache.move_to_end(path)
+                while len(_cache) > MAX_OPEN_DBS:
+                    _cache.popitem(last=False)
+                entries[key] = value
+                entries.move_to_end(key)
+                while len(entries) > CACHE_SIZE:
+                    entries.popitem(last=False)
+            return _copy(value)
+        return wrapper
+    return decorator
+
+
+def table_generation(table: str) -> int:
+    """Write counter of `table` in the current DB; changes on every write."""
+    path = db_path()
+    migrate()
+    with _cache_lock:
+        _check_foreign_writes(path)
+        # Both only ever grow, so the sum changes whenever either does.
+        return _generations.get((path, table), 0) + _epochs.get(path, 0)
+
+
+def clear_cache():
+    """Drop all cached reads (e.g. after editing the DB file by hand)."""
+    with _cache_lock:
+        _cache.clear()
+    _reset_streak()
+
+
+# -------------------------
+# Query tracing (opt-in)
+# -------------------------
+# Off by default and free when off. ui.query_diagnostics() turns it on for
+# one browser session (?debug=1); LAZY_GENIUS_TRACE_LOG=<file> logs every
+# statement of the process to a file.
+TRACE_LOG = os.environ.get("LAZY_GENIUS_TRACE_LOG", "")
+
+_sql_log = logging.getLogger("lazy_genius.sql")
+if TRACE_LOG:
+    _handler = logging.FileHandler(TRACE_LOG, encoding="utf-8")
+    _handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+    _sql_log.addHandler(_handler)
+    _sql_log.setLevel(logging.INFO)
+
+_query_stats = contextvars.ContextVar("query_stats", default=None)
+
+
+def _normalize_sql(sql: str) -> str:
+    """Collapse whitespace, string literals and placeholder lists so repeats group together."""
+    sql = re.sub(r"'(?:[^']|'')*'", "?", sql)
+    sql = re.sub(r"\?(?:\s*,\s*\?)+", "?, ...", sql)
+    return " ".join(sql.split())
+
+
+class QueryStats:
+    """Statements (and cache hits) recorded while this collector is active."""
+
+    def __init__(self, label: str = ""):
+        self.label = label
+        self.records = []  # [normalized sql, ms, rows]
+        self.engine_statements = 0  # everything SQLite ran, incl. trigger bodies
+        self.trigger_statements = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def _on_statement(self, sql: str):
+        # set_trace_callback hook: sees implicit BEGIN/COMMIT and triggers too.
+        self.engine_statements += 1
+        if sql.startswith("-- TRIGGER"):
+            self.trigger_statements += 1
+
+    @property
+    def total_ms(self) -> float:
+        return sum(r[1] for r in self.records)
+
+    def summary(self):
+        """Per-statement totals, slowest first."""
+        agg = {}
+        for sql, ms, rows in self.records:
+            a = agg.setdefault(sql, {"sql": sql, "calls": 0, "total_ms": 0.0, "max_ms": 0.0, "rows": 0})
+            a["calls"] += 1
+            a["total_ms"] += ms
+            a["max_ms"] = max(a["max_ms"], ms)
+            a["rows"] += rows
+        return sorted(agg.values(), key=lambda a: a["total_ms"], reverse=True)
+
+
+def start_query_stats(label: str = "") -> QueryStats:
+    """Record queries from this thread/context into a fresh QueryStats."""
+    stats = QueryStats(label)
+    _query_stats.set(stats)
+    return stats
+
+
+def stop_query_stats():
+    _query_stats.set(None)
+
+
+class _TracedCursor:
+    """Cursor proxy timing execute + fetches and counting returned rows."""
+
+    def __init__(self, cur, records):
+        self._cur = cur
+        self._records = records
+        self._rec = None
+
+    def _timed(self, fn, *args):
+        t = time.perf_counter()
+        out = fn(*args)
+        self._rec[1] += (time.perf_counter() - t) * 1000
+        return out
+
+    def execute(self, sql, params=()):
+        self._rec = [_normalize_sql(sql), 0.0, 0]
+        self._records.append(self._rec)
+        self._timed(self._cur.execute, sql, params)
+        return self
 
-def get_conn():
-    """Create (or open) the SQLite database file and return a connection."""
-    return sqlite3.connect(DB_NAME, check_same_thread=False)
+    def executemany(self, sql, seq):
+        self._rec = [_normalize_sql(sql), 0.0, 0]
+        self._records.append(self._rec)
+        self._timed(self._cur.executemany, sql, seq)
+        self._rec[2] = max(self._cur.rowcount, 0)
+        return self
+
+    def fetchone(self):
+        row = self._timed(self._cur.fetchone)
+        self._rec[2] += row is not None
+        return row
+
+    def fetchmany(self, size=1):
+        rows = self._timed(self._cur.fetchmany, size)
+        self._rec[2] += len(rows)
+        return rows
 
+    def fetchall(self):
+        rows = self._timed(self._cur.fetchall)
+        self._rec[2] += len(rows)
+        return rows
 
-def init_db():
-    """Create tables if they don't exist yet."""
-    conn = get_conn()
-    cur = conn.cursor()
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    def __getattr__(self, name):
+        return getattr(self._cur, name)
+
+
+class _TracedConnection:
+    """Connection proxy handing out _TracedCursors."""
 
+    def __init__(self, conn, records):
+        self._conn = conn
+        self._records = records
+
+    def cursor(self):
+        return _TracedCursor(self._conn.cursor(), self._records)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq):
+        return self.cursor().executemany(sql, seq)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def get_conn(path: str = None):
+    """Create (or open) the SQLite database file and return a connection."""
+    path = path or db_path()
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+    # WAL lets readers and the writer overlap and batches fsyncs at checkpoints.
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    return conn
+
+
+_pools_lock = threading.Lock()
+_pools = OrderedDict()  # DB file -> idle connections, least recently used first
+
+
+def _pool_for(path: str):
+    with _pools_lock:
+        pool = _pools.get(path)
+        if pool is None:
+            pool = _pools[path] = queue.LifoQueue(maxsize=POOL_SIZE)
+        _pools.move_to_end(path)
+
+        # Too many files open: close the least recently used user's idle handles.
+        while len(_pools) > MAX_OPEN_DBS:
+            _, old = _pools.popitem(last=False)
+            while True:
+                try:
+                    old.get_nowait().close()
+                except queue.Empty:
+                    break
+    return pool
+
+
+@contextmanager
+def connection():
+    """
+    Borrow a pooled connection to the current user's database.
+    Commits when the block finishes, rolls back if it raises.
+    """
+    path = db_path()
+    migrate()
+    pool = _pool_for(path)
+    try:
+        conn = pool.get_nowait()
+    except queue.Empty:
+        conn = get_conn(path)
+
+    stats = _query_stats.get()
+    traced = stats is not None or TRACE_LOG
+    if traced:
+        records = []
+        if stats is not None:
+            conn.set_trace_callback(stats._on_statement)
+
+    try:
+        yield _TracedConnection(conn, records) if traced else conn
+        _commit(conn, path)
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        if traced:
+            conn.set_trace_callback(None)
+            if stats is not None:
+                stats.records.extend(records)
+            for sql, ms, rows in records:
+                _sql_log.info("%8.2f ms %7d rows  %s", ms, rows, sql)
+        try:
+            if _pools.get(path) is not pool:
+                raise queue.Full  # pool was evicted while we held this one
+            pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+
+# -------------------------
+# Schema migrations
+# -------------------------
+# PRAGMA user_version records how many MIGRATIONS have been applied. Each
+# migration runs once, inside the same transaction as its version bump.
+# Append new migrations at the end; never edit or reorder applied ones.
+
+def _add_column(cur, table: str, column: str, decl: str):
+    cols = [r[1] for r in cur.execute(f"PRAGMA table_info({table})")]
+    if column not in cols:
+        cur.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+
+def _m001_base_tables(cur):
+    # IF NOT EXISTS: databases created before versioning already have these.
     cur.execute("""
         CREATE TABLE IF NOT EXISTS sessions (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -24,50 +471,776 @@ def init_db():
         )
     """)
 
-    conn.commit()
-    conn.close()
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS questions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            topic TEXT NOT NULL,
+            q_type TEXT NOT NULL,
+            question TEXT NOT NULL,
+            answer TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            correct_count INTEGER DEFAULT 0,
+            wrong_count INTEGER DEFAULT 0
+        )
+    """)
+
+    # Settings (goal minutes + exam date)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS settings (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        )
+    """)
+
+    # Daily todo checklist
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS todos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            todo_date TEXT NOT NULL,        -- YYYY-MM-DD
+            task TEXT NOT NULL,
+            done INTEGER DEFAULT 0
+        )
+    """)
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS profile (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            full_name TEXT,
+            nickname TEXT,
+            school TEXT,
+            year TEXT,
+            university TEXT,
+            email TEXT,
+            phone TEXT,
+            bio TEXT,
+            photo_path TEXT,
+            updated_at TEXT
+        )
+    """)
+
+    # Ensure one row exists
+    cur.execute("INSERT OR IGNORE INTO profile (id) VALUES (1)")
+
+
+def _m002_todos_merge_daily_tasks(cur):
+    """todos also holds the old app.py daily_tasks rows (from mbbs.db)."""
+    _add_column(cur, "todos", "created_at", "TEXT")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_todos_date ON todos(todo_date)")
+
+    # The legacy file belongs to the original single-student DB only.
+    if db_path() != DB_NAME:
+        return
+
+    # Already copied by the pre-versioning init_home_tables.
+    cur.execute("SELECT 1 FROM settings WHERE key = 'legacy_daily_tasks_merged'")
+    if cur.fetchone() or not os.path.exists(LEGACY_TASKS_DB):
+        return
+
+    # Read through a separate connection: ATTACH can't run mid-transaction.
+    legacy = sqlite3.connect(LEGACY_TASKS_DB)
+    try:
+        has_table = legacy.execute("""
+            SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'daily_tasks'
+        """).fetchone()
+        rows = legacy.execute("""
+            SELECT task_date, task_text, is_done, created_at
+            FROM daily_tasks
+            ORDER BY id
+        """).fetchall() if has_table else []
+    finally:
+        legacy.close()
+
+    cur.executemany("""
+        INSERT INTO todos (todo_date, task, done, created_at)
+        VALUES (?, ?, ?, ?)
+    """, rows)
+
+
+def _m003_daily_minutes(cur):
+    """Per-day, per-activity rollup of sessions, kept in sync by triggers."""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS daily_minutes (
+            day TEXT NOT NULL,              -- YYYY-MM-DD (session start)
+            activity TEXT NOT NULL,
+            minutes REAL NOT NULL,
+            sessions INTEGER NOT NULL,
+            PRIMARY KEY (day, activity)
+        ) WITHOUT ROWID
+    """)
+
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_sessions_ins AFTER INSERT ON sessions
+        BEGIN
+            INSERT INTO daily_minutes (day, activity, minutes, sessions)
+            VALUES (substr(NEW.start_time, 1, 10), NEW.activity, NEW.duration_minutes, 1)
+            ON CONFLICT (day, activity) DO UPDATE
+            SET minutes = minutes + excluded.minutes, sessions = sessions + 1;
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_sessions_del AFTER DELETE ON sessions
+        BEGIN
+            UPDATE daily_minutes
+            SET minutes = minutes - OLD.duration_minutes, sessions = sessions - 1
+            WHERE day = substr(OLD.start_time, 1, 10) AND activity = OLD.activity;
+            DELETE FROM daily_minutes WHERE sessions <= 0;
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_sessions_upd AFTER UPDATE ON sessions
+        BEGIN
+            UPDATE daily_minutes
+            SET minutes = minutes - OLD.duration_minutes, sessions = sessions - 1
+            WHERE day = substr(OLD.start_time, 1, 10) AND activity = OLD.activity;
+            DELETE FROM daily_minutes WHERE sessions <= 0;
+            INSERT INTO daily_minutes (day, activity, minutes, sessions)
+            VALUES (substr(NEW.start_time, 1, 10), NEW.activity, NEW.duration_minutes, 1)
+            ON CONFLICT (day, activity) DO UPDATE
+            SET minutes = minutes + excluded.minutes, sessions = sessions + 1;
+        END
+    """)
+
+    cur.execute("DELETE FROM daily_minutes")
+    cur.execute("""
+        INSERT INTO daily_minutes (day, activity, minutes, sessions)
+        SELECT substr(start_time, 1, 10), activity, SUM(duration_minutes), COUNT(*)
+        FROM sessions
+        GROUP BY 1, 2
+    """)
+
+
+def _m004_topic_stats(cur):
+    """Per-topic question counts and answer totals, kept in sync by triggers."""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS topic_stats (
+            topic TEXT PRIMARY KEY,
+            question_count INTEGER NOT NULL,
+            correct INTEGER NOT NULL,
+            wrong INTEGER NOT NULL,
+            last_practiced TEXT             -- last mark_answer on any of its questions
+        ) WITHOUT ROWID
+    """)
+    # Same expression as get_weakest_topics' ORDER BY, so it walks the index.
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_topic_stats_accuracy
+        ON topic_stats ((correct * 1.0 / (correct + wrong)))
+    """)
+
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_questions_ins AFTER INSERT ON questions
+        BEGIN
+            INSERT INTO topic_stats (topic, question_count, correct, wrong)
+            VALUES (NEW.topic, 1, NEW.correct_count, NEW.wrong_count)
+            ON CONFLICT (topic) DO UPDATE
+            SET question_count = question_count + 1,
+                correct = correct + excluded.correct,
+                wrong = wrong + excluded.wrong;
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_questions_del AFTER DELETE ON questions
+        BEGIN
+            UPDATE topic_stats
+            SET question_count = question_count - 1,
+                correct = correct - OLD.correct_count,
+                wrong = wrong - OLD.wrong_count
+            WHERE topic = OLD.topic;
+            DELETE FROM topic_stats WHERE question_count <= 0;
+        END
+    """)
+    # The cleanup DELETE runs last so a same-topic update keeps last_practiced.
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_questions_upd
+        AFTER UPDATE OF topic, correct_count, wrong_count ON questions
+        BEGIN
+            UPDATE topic_stats
+            SET question_count = question_count - 1,
+                correct = correct - OLD.correct_count,
+                wrong = wrong - OLD.wrong_count
+            WHERE topic = OLD.topic;
+            INSERT INTO topic_stats (topic, question_count, correct, wrong, last_practiced)
+            VALUES (
+                NEW.topic, 1, NEW.correct_count, NEW.wrong_count,
+                CASE WHEN NEW.correct_count + NEW.wrong_count > OLD.correct_count + OLD.wrong_count
+                     THEN strftime('%Y-%m-%dT%H:%M:%S', 'now', 'localtime') END
+            )
+            ON CONFLICT (topic) DO UPDATE
+            SET question_count = question_count + 1,
+                correct = correct + excluded.correct,
+                wrong = wrong + excluded.wrong,
+                last_practiced = COALESCE(excluded.last_practiced, last_practiced);
+            DELETE FROM topic_stats WHERE question_count <= 0;
+        END
+    """)
+
+    cur.execute("DELETE FROM topic_stats")
+    cur.execute("""
+        INSERT INTO topic_stats (topic, question_count, correct, wrong)
+        SELECT topic, COUNT(*), SUM(correct_count), SUM(wrong_count)
+        FROM questions
+        GROUP BY topic
+    """)
+
+
+def _m005_topics(cur):
+    """
+    Topic names move to a topics dictionary (case-insensitive, trimmed);
+    questions keeps an integer topic_id and topic_stats is re-keyed by it.
+    """
+    cur.execute("""
+        CREATE TABLE topics (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE COLLATE NOCASE
+        )
+    """)
+    # Oldest spelling wins when names differ only by case/whitespace.
+    cur.execute("""
+        INSERT OR IGNORE INTO topics (name)
+        SELECT trim(topic) FROM questions GROUP BY trim(topic) ORDER BY MIN(id)
+    """)
+
+    for name in ("trg_questions_ins", "trg_questions_del", "trg_questions_upd"):
+        cur.execute(f"DROP TRIGGER IF EXISTS {name}")
+    cur.execute("DROP INDEX idx_topic_stats_accuracy")
+    cur.execute("ALTER TABLE topic_stats RENAME TO topic_stats_old")
+
+    # SQLite can't swap a column in place: rebuild questions.
+    cur.execute("""
+        CREATE TABLE questions_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            topic_id INTEGER NOT NULL REFERENCES topics (id),
+            q_type TEXT NOT NULL,
+            question TEXT NOT NULL,
+            answer TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            correct_count INTEGER DEFAULT 0,
+            wrong_count INTEGER DEFAULT 0
+        )
+    """)
+    cur.execute("""
+        INSERT INTO questions_new (id, topic_id, q_type, question, answer, created_at,
+                                   correct_count, wrong_count)
+        SELECT q.id, t.id, q.q_type, q.question, q.answer, q.created_at,
+               q.correct_count, q.wrong_count
+        FROM questions q
+        JOIN topics t ON t.name = trim(q.topic)
+    """)
+    cur.execute("DROP TABLE questions")
+    cur.execute("ALTER TABLE questions_new RENAME TO questions")
+    cur.execute("CREATE INDEX idx_questions_topic ON questions (topic_id, created_at)")
+
+    cur.execute("""
+        CREATE TABLE topic_stats (
+            topic_id INTEGER PRIMARY KEY REFERENCES topics (id),
+            question_count INTEGER NOT NULL,
+            correct INTEGER NOT NULL,
+            wrong INTEGER NOT NULL,
+            last_practiced TEXT             -- last mark_answer on any of its questions
+        ) WITHOUT ROWID
+    """)
+    cur.execute("""
+        CREATE INDEX idx_topic_stats_accuracy
+        ON topic_stats ((correct * 1.0 / (correct + wrong)))
+    """)
+
+    cur.execute("""
+        CREATE TRIGGER trg_questions_ins AFTER INSERT ON questions
+        BEGIN
+            INSERT INTO topic_stats (topic_id, question_count, correct, wrong)
+            VALUES (NEW.topic_id, 1, NEW.correct_count, NEW.wrong_count)
+            ON CONFLICT (topic_id) DO UPDATE
+            SET question_count = question_count + 1,
+                correct = correct + excluded.correct,
+                wrong = wrong + excluded.wrong;
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER trg_questions_del AFTER DELETE ON questions
+        BEGIN
+            UPDATE topic_stats
+            SET question_count = question_count - 1,
+                correct = correct - OLD.correct_count,
+                wrong = wrong - OLD.wrong_count
+            WHERE topic_id = OLD.topic_id;
+            DELETE FROM topic_stats WHERE question_count <= 0;
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER trg_questions_upd
+        AFTER UPDATE OF topic_id, correct_count, wrong_count ON questions
+        BEGIN
+            UPDATE topic_stats
+            SET question_count = question_count - 1,
+                correct = correct - OLD.correct_count,
+                wrong = wrong - OLD.wrong_count
+            WHERE topic_id = OLD.topic_id;
+            INSERT INTO topic_stats (topic_id, question_count, correct, wrong, last_practiced)
+            VALUES (
+                NEW.topic_id, 1, NEW.correct_count, NEW.wrong_count,
+                CASE WHEN NEW.correct_count + NEW.wrong_count > OLD.correct_count + OLD.wrong_count
+                     THEN strftime('%Y-%m-%dT%H:%M:%S', 'now', 'localtime') END
+            )
+            ON CONFLICT (topic_id) DO UPDATE
+            SET question_count = question_count + 1,
+                correct = correct + excluded.correct,
+                wrong = wrong + excluded.wrong,
+                last_practiced = COALESCE(excluded.last_practiced, last_practiced);
+            DELETE FROM topic_stats WHERE question_count <= 0;
+        END
+    """)
+
+    cur.execute("""
+        INSERT INTO topic_stats (topic_id, question_count, correct, wrong)
+        SELECT topic_id, COUNT(*), SUM(correct_count), SUM(wrong_count)
+        FROM questions
+        GROUP BY topic_id
+    """)
+    # last_practiced can't be rebuilt from questions; carry it over.
+    cur.execute("""
+        UPDATE topic_stats
+        SET last_practiced = (
+            SELECT MAX(o.last_practiced)
+            FROM topic_stats_old o
+            JOIN topics t ON t.name = trim(o.topic)
+            WHERE t.id = topic_stats.topic_id
+        )
+    """)
+    cur.execute("DROP TABLE topic_stats_old")
+
+
+def _pack_answer(text: str):
+    """(compressed, body) for the answers table."""
+    raw = text.encode("utf-8")
+    if len(raw) >= ANSWER_COMPRESS_MIN:
+        packed = zlib.compress(raw)
+        if len(packed) < len(raw):
+            return 1, packed
+    return 0, text
+
+
+def _unpack_answer(compressed, body) -> str:
+    if body is None:
+        return ""
+    return zlib.decompress(body).decode("utf-8") if compressed else body
+
+
+def _m006_answers(cur):
+    """Answer bodies move out of questions into answers, compressed when long."""
+    cur.execute("""
+        CREATE TABLE answers (
+            question_id INTEGER PRIMARY KEY REFERENCES questions (id) ON DELETE CASCADE,
+            compressed INTEGER NOT NULL,    -- 1: body is zlib'd UTF-8, 0: plain text
+            body BLOB NOT NULL
+        )
+    """)
+    src = cur.connection.execute("SELECT id, answer FROM questions")
+    cur.executemany(
+        "INSERT INTO answers (question_id, compressed, body) VALUES (?, ?, ?)",
+        ((q_id, *_pack_answer(answer)) for q_id, answer in src),
+    )
+    cur.execute("ALTER TABLE questions DROP COLUMN answer")
+
+
+def _m007_last_answered(cur):
+    """When each question was last marked (feeds the adaptive quiz sampler)."""
+    _add_column(cur, "questions", "last_answered_at", "TEXT")
+
+
+def _m008_notes_library(cur):
+    """
+    Saved notes per topic, stored as hashed paragraphs; questions remember
+    the paragraph they came from, and questions of removed paragraphs are
+    moved to retired_questions.
+    """
+    cur.execute("""
+        CREATE TABLE note_paragraphs (
+            id INTEGER PRIMARY KEY,
+            topic_id INTEGER NOT NULL REFERENCES topics (id),
+            position INTEGER NOT NULL,
+            hash TEXT NOT NULL,             -- sha1 of the whitespace-normalized text
+            body TEXT NOT NULL,
+            pending INTEGER NOT NULL DEFAULT 0,  -- 1: questions must be (re)generated
+            UNIQUE (topic_id, hash)
+        )
+    """)
+    _add_column(cur, "questions", "paragraph_id", "INTEGER REFERENCES note_paragraphs (id)")
+    cur.execute("CREATE INDEX idx_questions_paragraph ON questions (paragraph_id)")
+
+    cur.execute("""
+        CREATE TABLE retired_questions (
+            id INTEGER PRIMARY KEY,         -- the question's id while it was live
+            topic_id INTEGER NOT NULL,
+            q_type TEXT NOT NULL,
+            question TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            correct_count INTEGER,
+            wrong_count INTEGER,
+            last_answered_at TEXT,
+            answer_compressed INTEGER,
+            answer_body BLOB,
+            paragraph_body TEXT,            -- the notes text it was written from
+            retired_at TEXT NOT NULL
+        )
+    """)
+
+
+def _m009_answer_keys(cur):
+    """
+    Grading key per question (core-answer terms, tf, keyword flag) plus a
+    trigger-maintained document-frequency rollup for IDF weighting.
+    """
+    cur.execute("""
+        CREATE TABLE question_terms (
+            question_id INTEGER NOT NULL REFERENCES questions (id) ON DELETE CASCADE,
+            term TEXT NOT NULL,
+            tf INTEGER NOT NULL,
+            keyword INTEGER NOT NULL,       -- 1: must-mention word when grading
+            PRIMARY KEY (question_id, term)
+        ) WITHOUT ROWID
+    """)
+    cur.execute("""
+        CREATE TABLE term_df (
+            term TEXT PRIMARY KEY,
+            df INTEGER NOT NULL             -- questions whose key has this term
+        ) WITHOUT ROWID
+    """)
+    cur.execute("""
+        CREATE TRIGGER trg_question_terms_ins AFTER INSERT ON question_terms
+        BEGIN
+            INSERT INTO term_df (term, df) VALUES (NEW.term, 1)
+            ON CONFLICT (term) DO UPDATE SET df = df + 1;
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER trg_question_terms_del AFTER DELETE ON question_terms
+        BEGIN
+            UPDATE term_df SET df = df - 1 WHERE term = OLD.term;
+            DELETE FROM term_df WHERE term = OLD.term AND df <= 0;
+        END
+    """)
+
+    src = cur.connection.execute("SELECT question_id, compressed, body FROM answers")
+    cur.executemany(
+        "INSERT INTO question_terms (question_id, term, tf, keyword) VALUES (?, ?, ?, ?)",
+        ((q_id, *term) for q_id, compressed, body in src
+         for term in answer_terms(_unpack_answer(compressed, body))),
+    )
+
+
+def _m010_session_indexes(cur):
+    """
+    History paging: newest-first keyset scans on (start_time, id), all
+    sessions or one activity. The rowid (id) rides along in every index.
+    """
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_sessions_start ON sessions (start_time)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_sessions_activity_start ON sessions (activity, start_time)")
+
+
+def _m011_compact_sessions(cur):
+    """
+    Sessions move to session_log: an activity id from a small lookup table
+    and integer epoch seconds instead of label + ISO strings. Times stay
+    local wall-clock time (no timezone), so date(start_ts, 'unixepoch') is
+    the day the student saw. `sessions` lives on as a view with the old
+    columns (plus start_ts / activity_id) and INSTEAD OF triggers, so
+    existing reads, imports and exports keep working.
+    """
+    cur.execute("""
+        CREATE TABLE activities (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE       -- label shown in the app, emoji included
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE session_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            activity_id INTEGER NOT NULL REFERENCES activities (id),
+            start_ts INTEGER NOT NULL,      -- epoch seconds of local wall-clock time
+            end_ts INTEGER NOT NULL,
+            duration_s INTEGER NOT NULL
+        )
+    """)
+
+    cur.execute("INSERT INTO activities (name) SELECT DISTINCT activity FROM sessions ORDER BY activity")
+    cur.execute("""
+        INSERT INTO session_log (id, activity_id, start_ts, end_ts, duration_s)
+        SELECT s.id, a.id,
+               CAST(strftime('%s', s.start_time) AS INTEGER),
+               CAST(strftime('%s', s.end_time) AS INTEGER),
+               CAST(round(s.duration_minutes * 60) AS INTEGER)
+        FROM sessions s
+        JOIN activities a ON a.name = s.activity
+        ORDER BY s.id
+    """)
+    # Ids of deleted sessions are never handed out again, same as before.
+    cur.execute("DELETE FROM sqlite_sequence WHERE name = 'session_log'")
+    cur.execute("UPDATE sqlite_sequence SET name = 'session_log' WHERE name = 'sessions'")
+    cur.execute("DROP TABLE sessions")  # its triggers and indexes go with it
+
+    cur.execute("CREATE INDEX idx_session_log_start ON session_log (start_ts)")
+    cur.execute("CREATE INDEX idx_session_log_activity ON session_log (activity_id, start_ts)")
+
+    # daily_minutes keeps its shape; only where its numbers come from changes.
+    cur.execute("""
+        CREATE TRIGGER trg_session_log_ins AFTER INSERT ON session_log
+        BEGIN
+            INSERT INTO daily_minutes (day, activity, minutes, sessions)
+            VALUES (date(NEW.start_ts, 'unixepoch'),
+                    (SELECT name FROM activities WHERE id = NEW.activity_id),
+                    NEW.duration_s / 60.0, 1)
+            ON CONFLICT (day, activity) DO UPDATE
+            SET minutes = minutes + excluded.minutes, sessions = sessions + 1;
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER trg_session_log_del AFTER DELETE ON session_log
+        BEGIN
+            UPDATE daily_minutes
+            SET minutes = minutes - OLD.duration_s / 60.0, sessions = sessions - 1
+            WHERE day = date(OLD.start_ts, 'unixepoch')
+              AND activity = (SELECT name FROM activities WHERE id = OLD.activity_id);
+            DELETE FROM daily_minutes WHERE sessions <= 0;
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER trg_session_log_upd AFTER UPDATE ON session_log
+        BEGIN
+            UPDATE daily_minutes
+            SET minutes = minutes - OLD.duration_s / 60.0, sessions = sessions - 1
+            WHERE day = date(OLD.start_ts, 'unixepoch')
+              AND activity = (SELECT name FROM activities WHERE id = OLD.activity_id);
+            DELETE FROM daily_minutes WHERE sessions <= 0;
+            INSERT INTO daily_minutes (day, activity, minutes, sessions)
+            VALUES (date(NEW.start_ts, 'unixepoch'),
+                    (SELECT name FROM activities WHERE id = NEW.activity_id),
+                    NEW.duration_s / 60.0, 1)
+            ON CONFLICT (day, activity) DO UPDATE
+            SET minutes = minutes + excluded.minutes, sessions = sessions + 1;
+        END
+    """)
+    # Durations are whole seconds now: rebuild so later deletes net to zero.
+    cur.execute("DELETE FROM daily_minutes")
+    cur.execute("""
+        INSERT INTO daily_minutes (day, activity, minutes, sessions)
+        SELECT date(l.start_ts, 'unixepoch'), a.name, SUM(l.duration_s) / 60.0, COUNT(*)
+        FROM session_log l
+        JOIN activities a ON a.id = l.activity_id
+        GROUP BY 1, 2
+    """)
+
+    # Compatibility view. Filter on start_ts / activity_id to hit the indexes.
+    cur.execute("""
+        CREATE VIEW sessions AS
+        SELECT l.id,
+               a.name AS activity,
+               -- datetime() + replace() formats ~35% faster than strftime().
+               replace(datetime(l.start_ts, 'unixepoch'), ' ', 'T') AS start_time,
+               replace(datetime(l.end_ts, 'unixepoch'), ' ', 'T') AS end_time,
+               l.duration_s / 60.0 AS duration_minutes,
+               l.start_ts,
+               l.activity_id
+        FROM session_log l
+        JOIN activities a ON a.id = l.activity_id
+    """)
+    cur.execute("""
+        CREATE TRIGGER trg_sessions_view_ins INSTEAD OF INSERT ON sessions
+        BEGIN
+            INSERT OR IGNORE INTO activities (name) VALUES (NEW.activity);
+            INSERT INTO session_log (id, activity_id, start_ts, end_ts, duration_s)
+            VALUES (NEW.id,
+                    (SELECT id FROM activities WHERE name = NEW.activity),
+                    CAST(strftime('%s', NEW.start_time) AS INTEGER),
+                    CAST(strftime('%s', NEW.end_time) AS INTEGER),
+                    CAST(round(NEW.duration_minutes * 60) AS INTEGER));
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER trg_sessions_view_upd INSTEAD OF UPDATE ON sessions
+        BEGIN
+            INSERT OR IGNORE INTO activities (name) VALUES (NEW.activity);
+            UPDATE session_log
+            SET activity_id = (SELECT id FROM activities WHERE name = NEW.activity),
+                start_ts = CAST(strftime('%s', NEW.start_time) AS INTEGER),
+                end_ts = CAST(strftime('%s', NEW.end_time) AS INTEGER),
+                duration_s = CAST(round(NEW.duration_minutes * 60) AS INTEGER)
+            WHERE id = OLD.id;
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER trg_sessions_view_del INSTEAD OF DELETE ON sessions
+        BEGIN
+            DELETE FROM session_log WHERE id = OLD.id;
+        END
+    """)
+
+
+def _m012_note_texts(cur):
+    """
+    The notes text itself, as saved. note_paragraphs holds each distinct
+    paragraph once, so repeated paragraphs were lost from the stored note.
+    """
+    cur.execute("""
+        CREATE TABLE note_texts (
+            topic_id INTEGER PRIMARY KEY REFERENCES topics (id),
+            body TEXT NOT NULL
+        )
+    """)
+    cur.execute("""
+        INSERT INTO note_texts (topic_id, body)
+        SELECT topic_id, group_concat(body, char(10, 10))
+        FROM (SELECT topic_id, body FROM note_paragraphs ORDER BY topic_id, position)
+        GROUP BY topic_id
+    """)
+
+
+def _m013_questions_created_index(cur):
+    """Newest-first bank preview: walk the latest questions, no full sort."""
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_questions_created ON questions (created_at)")
+
+
+def _m014_write_stamp(cur):
+    """Commit counter that lets other processes' caches notice our writes."""
+    cur.execute("""
+        CREATE TABLE write_stamp (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            n INTEGER NOT NULL
+        )
+    """)
+    cur.execute("INSERT INTO write_stamp (id, n) VALUES (1, 0)")
+
+
+MIGRATIONS = [
+    _m001_base_tables,
+    _m002_todos_merge_daily_tasks,
+    _m003_daily_minutes,
+    _m004_topic_stats,
+    _m005_topics,
+    _m006_answers,
+    _m007_last_answered,
+    _m008_notes_library,
+    _m009_answer_keys,
+    _m010_session_indexes,
+    _m011_compact_sessions,
+    _m012_note_texts,
+    _m013_questions_created_index,
+    _m014_write_stamp,
+]
+
+# Steps that free a lot of pages: the file is compacted once they commit.
+VACUUM_AFTER = {_m006_answers, _m011_compact_sessions}
+
+_migrate_lock = threading.Lock()
+_migrated = set()  # DB files already checked by this process
+
+
+def migrate():
+    """Apply pending MIGRATIONS once per process and DB file."""
+    path = db_path()
+    if path in _migrated:
+        return
+
+    with _migrate_lock:
+        if path in _migrated:
+            return
+
+        conn = get_conn(path)
+        conn.isolation_level = None  # we manage the transaction ourselves
+        try:
+            cur = conn.cursor()
+            # IMMEDIATE takes the write lock up front, so two processes
+            # starting together can't both apply the same migration.
+            cur.execute("BEGIN IMMEDIATE")
+            vacuum = False
+            try:
+                version = cur.execute("PRAGMA user_version").fetchone()[0]
+                for number, step in enumerate(MIGRATIONS, start=1):
+                    if number > version:
+                        step(cur)
+                        cur.execute(f"PRAGMA user_version = {number}")
+                        vacuum = vacuum or step in VACUUM_AFTER
+                cur.execute("COMMIT")
+            except BaseException:
+                cur.execute("ROLLBACK")
+                raise
+            if vacuum:
+                cur.execute("VACUUM")
+                # In WAL mode the main file only shrinks at a checkpoint.
+                cur.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        finally:
+            conn.close()
+
+        _migrated.add(path)
+
+
+def init_db():
+    """Make sure the schema is current (no-op once migrated)."""
+    migrate()
+
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _epoch(when) -> int:
+    """
+    session_log's integer time: seconds since 1970 of the local wall-clock
+    time (a datetime, date or ISO string), no timezone shift.
+    """
+    if isinstance(when, str):
+        when = datetime.fromisoformat(when)
+    elif not isinstance(when, datetime):
+        when = datetime.combine(when, datetime.min.time())
+    return int((when.replace(tzinfo=None) - _EPOCH).total_seconds())
+
+
+def _activity_id(cur, name: str) -> int:
+    """Id of activity label `name`, created on first use."""
+    row = cur.execute("SELECT id FROM activities WHERE name = ?", (name,)).fetchone()
+    if row:
+        return row[0]
+    cur.execute("INSERT INTO activities (name) VALUES (?)", (name,))
+    return cur.lastrowid
 
 
 def save_session(activity: str, start_time: datetime, end_time: datetime):
     """Save one tracked session to the database."""
-    duration_minutes = (end_time - start_time).total_seconds() / 60.0
+    start_ts, end_ts = _epoch(start_time), _epoch(end_time)
 
-    conn = get_conn()
-    cur = conn.cursor()
+    with connection() as conn:
+        cur = conn.cursor()
 
-    cur.execute("""
-        INSERT INTO sessions (activity, start_time, end_time, duration_minutes)
-        VALUES (?, ?, ?, ?)
-    """, (
-        activity,
-        start_time.isoformat(timespec="seconds"),
-        end_time.isoformat(timespec="seconds"),
-        duration_minutes
-    ))
+        cur.execute("""
+            INSERT INTO session_log (activity_id, start_ts, end_ts, duration_s)
+            VALUES (?, ?, ?, ?)
+        """, (_activity_id(cur, activity), start_ts, end_ts, end_ts - start_ts))
 
-    conn.commit()
-    conn.close()
+    _bump("sessions")
+    _streak_add_day(start_time.date())
 
 
 def get_today_sessions():
     """Return all sessions for today."""
     today = datetime.now().date().isoformat()  # YYYY-MM-DD
+    return _get_sessions_on(today)
 
-    conn = get_conn()
-    cur = conn.cursor()
 
-    cur.execute("""
-        SELECT activity, start_time, end_time, duration_minutes
-        FROM sessions
-        WHERE start_time LIKE ?
-        ORDER BY start_time DESC
-    """, (f"{today}%",))
+@_cached("sessions")
+def _get_sessions_on(day: str):
+    with connection() as conn:
+        cur = conn.cursor()
 
-    rows = cur.fetchall()
-    conn.close()
-    return rows
+        # Integer range on start_ts: an index range scan on session_log.
+        start = date.fromisoformat(day)
+        cur.execute("""
+            SELECT activity, start_time, end_time, duration_minutes
+            FROM sessions
+            WHERE start_ts >= ? AND start_ts < ?
+            ORDER BY start_ts DESC
+        """, (_epoch(start), _epoch(start + timedelta(days=1))))
+
+        return cur.fetchall()
 
 
+@_cached("sessions")
 def get_sessions_between(start_date, end_date):
     """
     Return sessions between start_date and end_date (inclusive).
@@ -78,244 +1251,866 @@ def get_sessions_between(start_date, end_date):
         start_date = start_date.isoformat()
     if hasattr(end_date, "isoformat"):
         end_date = end_date.isoformat()
+    end_date = date.fromisoformat(end_date) + timedelta(days=1)
 
-    conn = get_conn()
-    cur = conn.cursor()
+    with connection() as conn:
+        cur = conn.cursor()
 
-    cur.execute("""
-        SELECT activity, start_time, end_time, duration_minutes
-        FROM sessions
-        WHERE substr(start_time, 1, 10) BETWEEN ? AND ?
-        ORDER BY start_time DESC
-    """, (start_date, end_date))
+        cur.execute("""
+            SELECT activity, start_time, end_time, duration_minutes
+            FROM sessions
+            WHERE start_ts >= ? AND start_ts < ?
+            ORDER BY start_ts DESC
+        """, (_epoch(start_date), _epoch(end_date)))
+
+        return cur.fetchall()
+
+
+@_cached("sessions")
+def get_session_page(before=None, limit: int = 50, activity: str = None,
+                     start_date=None, end_date=None):
+    """
+    One page of session history, newest first:
+    [(id, activity, start_time, end_time, duration_minutes)].
+
+    Keyset paging: pass the last row's (start_time, id) as `before` to get
+    the next page. Each page is an index range scan of `limit` rows, however
+    deep into the history it is. Filters are optional; dates are inclusive.
+    """
+    where, params = [], []
+    if activity:
+        where.append("activity_id = (SELECT id FROM activities WHERE name = ?)")
+        params.append(activity)
+    if start_date:
+        where.append("start_ts >= ?")
+        params.append(_epoch(date.fromisoformat(str(start_date))))
+    if end_date:
+        where.append("start_ts < ?")
+        params.append(_epoch(date.fromisoformat(str(end_date)) + timedelta(days=1)))
+    if before:
+        where.append("(start_ts, id) < (?, ?)")
+        params.extend((_epoch(before[0]), int(before[1])))
+
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute(f"""
+            SELECT id, activity, start_time, end_time, duration_minutes
+            FROM sessions
+            {"WHERE " + " AND ".join(where) if where else ""}
+            ORDER BY start_ts DESC, id DESC
+            LIMIT ?
+        """, params + [int(limit)])
+        return cur.fetchall()
+
+
+def apply_session_changes(edited=(), deleted=()):
+    """
+    Save history edits in one transaction: `edited` [(id, activity,
+    start_time, end_time)] with datetimes (duration is recomputed, as in
+    save_session), `deleted` [id]. The rollup triggers follow along.
+    """
+    updates = []
+    for session_id, activity, start_time, end_time in edited:
+        activity = (activity or "").strip()
+        if not activity:
+            raise ValueError("activity is required")
+        if end_time < start_time:
+            raise ValueError("end time before start time")
+        start_ts, end_ts = _epoch(start_time), _epoch(end_time)
+        updates.append((activity, start_ts, end_ts, end_ts - start_ts, int(session_id)))
+    deletes = [(int(session_id),) for session_id in deleted]
+    if not (updates or deletes):
+        return
+
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.executemany("DELETE FROM session_log WHERE id = ?", deletes)
+        cur.executemany("""
+            UPDATE session_log
+            SET activity_id = ?, start_ts = ?, end_ts = ?, duration_s = ?
+            WHERE id = ?
+        """, [(_activity_id(cur, act), *rest) for act, *rest in updates])
+    _bump("sessions")
+    # Days can appear or disappear: recompute the streak next time.
+    _reset_streak(db_path())
 
-    rows = cur.fetchall()
-    conn.close()
-    return rows
 
 def init_questions_table():
-    conn = get_conn()
-    cur = conn.cursor()
+    migrate()
+
+
+def _topic_id(cur, name: str) -> int:
+    """Id of topic `name` (matched case-insensitively), created on first use."""
+    name = name.strip()
+    row = cur.execute("SELECT id FROM topics WHERE name = ?", (name,)).fetchone()
+    if row:
+        return row[0]
+    cur.execute("INSERT INTO topics (name) VALUES (?)", (name,))
+    return cur.lastrowid
+
+
+def _insert_question(cur, topic_id: int, q_type: str, question: str, answer: str,
+                     created_at: str, correct_count: int = 0, wrong_count: int = 0,
+                     paragraph_id: int = None):
     cur.execute("""
-        CREATE TABLE IF NOT EXISTS questions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            topic TEXT NOT NULL,
-            q_type TEXT NOT NULL,
-            question TEXT NOT NULL,
-            answer TEXT NOT NULL,
-            created_at TEXT NOT NULL,
-            correct_count INTEGER DEFAULT 0,
-            wrong_count INTEGER DEFAULT 0
-        )
-    """)
-    conn.commit()
-    conn.close()
+        INSERT INTO questions (topic_id, q_type, question, created_at, correct_count, wrong_count,
+                               paragraph_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, (topic_id, q_type, question, created_at, correct_count, wrong_count, paragraph_id))
+    q_id = cur.lastrowid
+    cur.execute(
+        "INSERT INTO answers (question_id, compressed, body) VALUES (?, ?, ?)",
+        (q_id, *_pack_answer(answer)),
+    )
+    cur.executemany(
+        "INSERT INTO question_terms (question_id, term, tf, keyword) VALUES (?, ?, ?, ?)",
+        [(q_id, *term) for term in answer_terms(answer)],
+    )
 
 
 def add_question(topic: str, q_type: str, question: str, answer: str):
-    from datetime import datetime
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("""
-        INSERT INTO questions (topic, q_type, question, answer, created_at)
-        VALUES (?, ?, ?, ?, ?)
-    """, (topic, q_type, question, answer, datetime.now().isoformat(timespec="seconds")))
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        cur = conn.cursor()
+        _insert_question(cur, _topic_id(cur, topic), q_type, question, answer,
+                         datetime.now().isoformat(timespec="seconds"))
+    _bump("questions")
 
 
-def get_questions(topic: str = None):
-    conn = get_conn()
-    cur = conn.cursor()
+@_cached("questions")
+def get_questions(topic: str = None, limit: int = None):
+    """
+    Question headers, newest first (at most `limit` of them):
+    [(id, topic, q_type, question, created_at, correct_count, wrong_count)].
+    Answers are not included; load them with get_cards(ids).
+    """
+    # LIMIT -1 means no limit in SQLite.
+    limit = -1 if limit is None else limit
+    with connection() as conn:
+        cur = conn.cursor()
+
+        if topic and topic.strip():
+            # Integer seek on idx_questions_topic, already in created_at order.
+            cur.execute("""
+                SELECT q.id, t.name, q.q_type, q.question, q.created_at,
+                       q.correct_count, q.wrong_count
+                FROM questions q
+                JOIN topics t ON t.id = q.topic_id
+                WHERE q.topic_id = (SELECT id FROM topics WHERE name = ?)
+                ORDER BY q.created_at DESC
+                LIMIT ?
+            """, (topic.strip(), limit))
+        else:
+            cur.execute("""
+                SELECT q.id, t.name, q.q_type, q.question, q.created_at,
+                       q.correct_count, q.wrong_count
+                FROM questions q
+                JOIN topics t ON t.id = q.topic_id
+                ORDER BY q.created_at DESC
+                LIMIT ?
+            """, (limit,))
+
+        return cur.fetchall()
+
+
+@_cached("questions")
+def get_answer(q_id: int) -> str:
+    """Full answer text for one question ("" if it doesn't exist)."""
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT compressed, body FROM answers WHERE question_id = ?", (q_id,))
+        row = cur.fetchone()
+    return _unpack_answer(*row) if row else ""
+
+
+@_cached("questions")
+def get_answer_key(q_id: int):
+    """Grading key of one question: [(term, tf, is_keyword)] (see nlp.grade)."""
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT term, tf, keyword
+            FROM question_terms
+            WHERE question_id = ?
+        """, (q_id,))
+        return cur.fetchall()
 
-    if topic and topic.strip():
+
+def iter_question_texts(after_id: int = 0, chunk_size: int = BULK_BATCH):
+    """Stream (id, topic, question, answer) for questions with id > after_id, by id."""
+    with connection() as conn:
+        cur = conn.cursor()
         cur.execute("""
-            SELECT id, topic, q_type, question, answer, created_at, correct_count, wrong_count
-            FROM questions
-            WHERE topic = ?
-            ORDER BY created_at DESC
-        """, (topic.strip(),))
-    else:
+            SELECT q.id, t.name, q.question, a.compressed, a.body
+            FROM questions q
+            JOIN topics t ON t.id = q.topic_id
+            LEFT JOIN answers a ON a.question_id = q.id
+            WHERE q.id > ?
+            ORDER BY q.id
+        """, (after_id,))
+        while True:
+            chunk = cur.fetchmany(chunk_size)
+            if not chunk:
+                break
+            for q_id, topic, question, compressed, body in chunk:
+                yield q_id, topic, question, _unpack_answer(compressed, body)
+
+
+def get_term_df(terms):
+    """{term: number of questions whose key has it} for these terms."""
+    terms = list(set(terms))
+    if not terms:
+        return {}
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute(f"""
+            SELECT term, df FROM term_df
+            WHERE term IN ({', '.join('?' for _ in terms)})
+        """, terms)
+        return dict(cur.fetchall())
+
+
+@_cached("questions")
+def get_topics():
+    """Names of every topic that currently has questions, A-Z (case-insensitive)."""
+    with connection() as conn:
+        cur = conn.cursor()
         cur.execute("""
-            SELECT id, topic, q_type, question, answer, created_at, correct_count, wrong_count
-            FROM questions
-            ORDER BY created_at DESC
+            SELECT t.name
+            FROM topic_stats s
+            JOIN topics t ON t.id = s.topic_id
+            ORDER BY t.name
         """)
-
-    rows = cur.fetchall()
-    conn.close()
-    return rows
+        return [r[0] for r in cur.fetchall()]
 
 
 def mark_answer(q_id: int, is_correct: bool):
-    conn = get_conn()
-    cur = conn.cursor()
-    if is_correct:
-        cur.execute("UPDATE questions SET correct_count = correct_count + 1 WHERE id = ?", (q_id,))
-    else:
-        cur.execute("UPDATE questions SET wrong_count = wrong_count + 1 WHERE id = ?", (q_id,))
-    conn.commit()
-    conn.close()
+    now = datetime.now().isoformat(timespec="seconds")
+    with connection() as conn:
+        cur = conn.cursor()
+        if is_correct:
+            cur.execute("""
+                UPDATE questions SET correct_count = correct_count + 1, last_answered_at = ?
+                WHERE id = ?
+            """, (now, q_id))
+        else:
+            cur.execute("""
+                UPDATE questions SET wrong_count = wrong_count + 1, last_answered_at = ?
+                WHERE id = ?
+            """, (now, q_id))
+    _bump("questions")
+
+
+def mark_answers(results):
+    """
+    Apply many (q_id, is_correct) results in one transaction (one commit),
+    e.g. a whole quiz deck. Repeats of the same question are summed first.
+    """
+    totals = {}
+    for q_id, is_correct in results:
+        correct, wrong = totals.get(q_id, (0, 0))
+        totals[q_id] = (correct + 1, wrong) if is_correct else (correct, wrong + 1)
+    if not totals:
+        return
+
+    now = datetime.now().isoformat(timespec="seconds")
+    with connection() as conn:
+        conn.executemany("""
+            UPDATE questions
+            SET correct_count = correct_count + ?, wrong_count = wrong_count + ?,
+                last_answered_at = ?
+            WHERE id = ?
+        """, [(correct, wrong, now, q_id) for q_id, (correct, wrong) in totals.items()])
+    _bump("questions")
+
+
+def get_question_weights(topic: str = None):
+    """
+    [(id, correct_count, wrong_count, last_answered_at)] for every question
+    (of one topic): the inputs of the quiz's adaptive sampler.
+    """
+    with connection() as conn:
+        cur = conn.cursor()
+        if topic and topic.strip():
+            cur.execute("""
+                SELECT id, correct_count, wrong_count, last_answered_at
+                FROM questions
+                WHERE topic_id = (SELECT id FROM topics WHERE name = ?)
+            """, (topic.strip(),))
+        else:
+            cur.execute("SELECT id, correct_count, wrong_count, last_answered_at FROM questions")
+        return cur.fetchall()
+
+
+def get_cards(ids):
+    """
+    [(header, answer)] for these question ids, in the same order (missing ids
+    are skipped); header is shaped like a get_questions row. One query.
+    """
+    ids = list(ids)
+    if not ids:
+        return []
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute(f"""
+            SELECT q.id, t.name, q.q_type, q.question, q.created_at,
+                   q.correct_count, q.wrong_count, a.compressed, a.body
+            FROM questions q
+            JOIN topics t ON t.id = q.topic_id
+            LEFT JOIN answers a ON a.question_id = q.id
+            WHERE q.id IN ({', '.join('?' for _ in ids)})
+        """, ids)
+        found = {r[0]: (r[:7], _unpack_answer(r[7], r[8])) for r in cur.fetchall()}
+    return [found[q_id] for q_id in ids if q_id in found]
+
 
 def delete_all_questions():
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM questions")
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        conn.execute("DELETE FROM questions")
+        # Saved notes stay; their next generation starts from scratch.
+        conn.execute("UPDATE note_paragraphs SET pending = 1")
+    _bump("questions", "notes")
 
-def init_home_tables():
-    conn = get_conn()
-    cur = conn.cursor()
 
-    # Settings (goal minutes + exam date)
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS settings (
-            key TEXT PRIMARY KEY,
-            value TEXT NOT NULL
-        )
-    """)
+@_cached("questions")
+def get_topic_stats():
+    """
+    Return [(topic, question_count, correct, wrong, last_practiced)] for every
+    topic, read from the topic_stats rollup (one row per topic).
+    """
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT t.name, s.question_count, s.correct, s.wrong, s.last_practiced
+            FROM topic_stats s
+            JOIN topics t ON t.id = s.topic_id
+            ORDER BY t.name
+        """)
+        return cur.fetchall()
 
-    # Daily todo checklist
+
+@_cached("questions")
+def get_question_count() -> int:
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT COALESCE(SUM(question_count), 0) FROM topic_stats")
+        return cur.fetchone()[0]
+
+
+@_cached("questions")
+def get_weakest_topics(limit: int = 5, min_attempts: int = 1):
+    """
+    Return the `limit` topics with the lowest accuracy (at least `min_attempts`
+    answers) as [(topic, accuracy, correct, wrong, last_practiced)].
+    """
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT t.name, s.correct * 1.0 / (s.correct + s.wrong), s.correct, s.wrong,
+                   s.last_practiced
+            FROM topic_stats s
+            JOIN topics t ON t.id = s.topic_id
+            WHERE s.correct + s.wrong >= ?
+            ORDER BY s.correct * 1.0 / (s.correct + s.wrong), s.topic_id
+            LIMIT ?
+        """, (max(1, min_attempts), limit))
+        return cur.fetchall()
+
+# -------------------------
+# Notes library
+# -------------------------
+# A topic's notes are kept as written (note_texts) and as paragraphs (split
+# on blank lines) keyed by a hash of their text, so re-saving edited notes
+# tells exactly which paragraphs are new and which are gone.
+def _split_paragraphs(text: str):
+    """
+    [(hash, paragraph)] in order, each distinct paragraph once (repeats
+    share their questions); re-wrapping a paragraph doesn't change its hash.
+    """
+    out, seen = [], set()
+    for para in re.split(r"\n\s*\n", text or ""):
+        para = para.strip()
+        if not para:
+            continue
+        digest = hashlib.sha1(" ".join(para.split()).encode("utf-8")).hexdigest()
+        if digest not in seen:
+            seen.add(digest)
+            out.append((digest, para))
+    return out
+
+
+def _saved_paragraphs(cur, topic: str):
+    """{hash: (paragraph id, pending)} of `topic`'s saved notes."""
     cur.execute("""
-        CREATE TABLE IF NOT EXISTS todos (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            todo_date TEXT NOT NULL,        -- YYYY-MM-DD
-            task TEXT NOT NULL,
-            done INTEGER DEFAULT 0
-        )
-    """)
+        SELECT hash, id, pending
+        FROM note_paragraphs
+        WHERE topic_id = (SELECT id FROM topics WHERE name = ?)
+    """, (topic.strip(),))
+    return {h: (pid, pending) for h, pid, pending in cur.fetchall()}
+
+
+@_cached("notes")
+def get_note(topic: str) -> str:
+    """The saved notes of `topic` ("" if none)."""
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT body
+            FROM note_texts
+            WHERE topic_id = (SELECT id FROM topics WHERE name = ?)
+        """, (topic.strip(),))
+        row = cur.fetchone()
+        return row[0] if row else ""
+
+
+def diff_note(topic: str, text: str):
+    """
+    Compare `text` with the saved notes of `topic` without writing anything.
+    Returns (new, retiring): paragraphs that need questions (new, edited or
+    pending) as [(hash, paragraph)] and how many questions belong to
+    paragraphs that are gone.
+    """
+    paragraphs = _split_paragraphs(text)
+    with connection() as conn:
+        cur = conn.cursor()
+        saved = _saved_paragraphs(cur, topic)
+        keep = {h for h, _ in paragraphs}
+        gone = [pid for h, (pid, _) in saved.items() if h not in keep]
+        retiring = 0
+        if gone:
+            cur.execute(f"""
+                SELECT COUNT(*) FROM questions
+                WHERE paragraph_id IN ({', '.join('?' for _ in gone)})
+            """, gone)
+            retiring = cur.fetchone()[0]
+    return [(h, p) for h, p in paragraphs if h not in saved or saved[h][1]], retiring
+
+
+def save_note(topic: str, text: str, questions=()) -> int:
+    """
+    Save `text` as `topic`'s notes in one transaction: add new paragraphs,
+    re-order kept ones, retire the questions of removed ones and insert
+    `questions` given as (paragraph_hash, q_type, question, answer).
+    Paragraphs left without new questions stay pending.
+    Returns the number of retired questions.
+    """
+    paragraphs = _split_paragraphs(text)
+    now = datetime.now().isoformat(timespec="seconds")
+
+    with connection() as conn:
+        cur = conn.cursor()
+        topic_id = _topic_id(cur, topic)
+        saved = _saved_paragraphs(cur, topic)
+        cur.execute("""
+            INSERT INTO note_texts (topic_id, body) VALUES (?, ?)
+            ON CONFLICT (topic_id) DO UPDATE SET body = excluded.body
+        """, (topic_id, (text or "").strip()))
+
+        ids = {}
+        for position, (digest, para) in enumerate(paragraphs):
+            if digest in saved:
+                ids[digest] = saved.pop(digest)[0]
+                cur.execute("""
+                    UPDATE note_paragraphs SET position = ?, body = ? WHERE id = ?
+                """, (position, para, ids[digest]))
+            else:
+                cur.execute("""
+                    INSERT INTO note_paragraphs (topic_id, position, hash, body, pending)
+                    VALUES (?, ?, ?, ?, 1)
+                """, (topic_id, position, digest, para))
+                ids[digest] = cur.lastrowid
+
+        # Whatever is left in `saved` was removed from the notes.
+        gone = [pid for pid, _ in saved.values()]
+        retired = 0
+        if gone:
+            marks = ", ".join("?" for _ in gone)
+            cur.execute(f"""
+                INSERT INTO retired_questions
+                SELECT q.id, q.topic_id, q.q_type, q.question, q.created_at, q.correct_count,
+                       q.wrong_count, q.last_answered_at, a.compressed, a.body, p.body, ?
+                FROM questions q
+                LEFT JOIN answers a ON a.question_id = q.id
+                JOIN note_paragraphs p ON p.id = q.paragraph_id
+                WHERE q.paragraph_id IN ({marks})
+            """, [now, *gone])
+            cur.execute(f"DELETE FROM questions WHERE paragraph_id IN ({marks})", gone)
+            retired = cur.rowcount
+            cur.execute(f"DELETE FROM note_paragraphs WHERE id IN ({marks})", gone)
+
+        answered = set()
+        for digest, q_type, question, answer in questions:
+            _insert_question(cur, topic_id, q_type, question, answer, now,
+                             paragraph_id=ids.get(digest))
+            answered.add(ids.get(digest))
+        answered.discard(None)
+        if answered:
+            cur.execute(f"""
+                UPDATE note_paragraphs SET pending = 0
+                WHERE id IN ({', '.join('?' for _ in answered)})
+            """, list(answered))
+    _bump("notes", "questions")
+    return retired
 
-    conn.commit()
-    conn.close()
+
+def init_home_tables():
+    migrate()
 
 
 def set_setting(key: str, value: str):
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("""
-        INSERT INTO settings(key, value)
-        VALUES (?, ?)
-        ON CONFLICT(key) DO UPDATE SET value=excluded.value
-    """, (key, value))
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            INSERT INTO settings(key, value)
+            VALUES (?, ?)
+            ON CONFLICT(key) DO UPDATE SET value=excluded.value
+        """, (key, value))
+    _bump("settings")
 
 
+@_cached("settings")
 def get_setting(key: str, default: str = "") -> str:
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("SELECT value FROM settings WHERE key = ?", (key,))
-    row = cur.fetchone()
-    conn.close()
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT value FROM settings WHERE key = ?", (key,))
+        row = cur.fetchone()
     return row[0] if row else default
 
 
 def add_todo(todo_date: str, task: str):
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("INSERT INTO todos(todo_date, task, done) VALUES (?, ?, 0)", (todo_date, task))
-    conn.commit()
-    conn.close()
+    task = (task or "").strip()
+    if not task:
+        return
 
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            INSERT INTO todos(todo_date, task, done, created_at)
+            VALUES (?, ?, 0, ?)
+        """, (todo_date, task, datetime.now().isoformat(timespec="seconds")))
+    _bump("todos")
+
+
+def get_todos(todo_date: str = None):
+    """Todos of `todo_date` (default today) as [(id, task, done)], newest first."""
+    # Resolved here, not in the cached reader, so midnight starts a new key.
+    return _get_todos_on(todo_date or date.today().isoformat())
 
-def get_todos(todo_date: str):
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT id, task, done
-        FROM todos
-        WHERE todo_date = ?
-        ORDER BY id DESC
-    """, (todo_date,))
-    rows = cur.fetchall()
-    conn.close()
-    return rows
+
+@_cached("todos")
+def _get_todos_on(todo_date: str):
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT id, task, done
+            FROM todos
+            WHERE todo_date = ?
+            ORDER BY id DESC
+        """, (todo_date,))
+        return cur.fetchall()
 
 
 def set_todo_done(todo_id: int, done: bool):
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("UPDATE todos SET done = ? WHERE id = ?", (1 if done else 0, todo_id))
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute("UPDATE todos SET done = ? WHERE id = ?", (1 if done else 0, int(todo_id)))
+    _bump("todos")
 
 
 def delete_todo(todo_id: int):
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM todos WHERE id = ?", (todo_id,))
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM todos WHERE id = ?", (int(todo_id),))
+    _bump("todos")
 
 
+def apply_todo_changes(todo_date: str, added=(), edited=(), deleted=()):
+    """
+    Save one round of checklist edits in a single transaction: `added`
+    [(task, done)] on `todo_date`, `edited` [(id, task, done)], `deleted`
+    [id]. Blank new tasks are skipped; blanking an existing one deletes it.
+    """
+    now = datetime.now().isoformat(timespec="seconds")
+    inserts = [(todo_date, task.strip(), int(bool(done)), now)
+               for task, done in added if (task or "").strip()]
+    updates = [(task.strip(), int(bool(done)), int(todo_id))
+               for todo_id, task, done in edited if (task or "").strip()]
+    deletes = [(int(todo_id),) for todo_id in deleted]
+    deletes += [(int(todo_id),) for todo_id, task, _ in edited if not (task or "").strip()]
+    if not (inserts or updates or deletes):
+        return
+
+    with connection() as conn:
+        conn.executemany("DELETE FROM todos WHERE id = ?", deletes)
+        conn.executemany("UPDATE todos SET task = ?, done = ? WHERE id = ?", updates)
+        conn.executemany("""
+            INSERT INTO todos(todo_date, task, done, created_at)
+            VALUES (?, ?, ?, ?)
+        """, inserts)
+    _bump("todos")
+
+
+def count_open_todos_before(todo_date: str = None) -> int:
+    """Unfinished todos dated before `todo_date` (what carry_over_todos would move)."""
+    return _count_open_todos_before(todo_date or date.today().isoformat())
+
+
+@_cached("todos")
+def _count_open_todos_before(todo_date: str) -> int:
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT COUNT(*) FROM todos WHERE todo_date < ? AND done = 0", (todo_date,))
+        return cur.fetchone()[0]
+
+
+def carry_over_todos(todo_date: str = None) -> int:
+    """Move every unfinished todo from earlier days onto `todo_date` (one UPDATE)."""
+    if todo_date is None:
+        todo_date = date.today().isoformat()
+
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute("UPDATE todos SET todo_date = ? WHERE todo_date < ? AND done = 0",
+                    (todo_date, todo_date))
+        moved = cur.rowcount
+    _bump("todos")
+    return moved
+
+
+def clear_completed_todos(todo_date: str = None):
+    if todo_date is None:
+        todo_date = date.today().isoformat()
+
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM todos WHERE todo_date = ? AND done = 1", (todo_date,))
+    _bump("todos")
+
+
+@_cached("sessions")
 def get_active_days():
     """Returns list of dates (YYYY-MM-DD) that have at least 1 session."""
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT DISTINCT substr(start_time, 1, 10) as d
-        FROM sessions
-        ORDER BY d DESC
-    """)
-    rows = cur.fetchall()
-    conn.close()
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT DISTINCT day
+            FROM daily_minutes
+            ORDER BY day DESC
+        """)
+        rows = cur.fetchall()
     return [r[0] for r in rows]
 
 
+@_cached("sessions")
 def get_minutes_for_date(d: str) -> float:
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT COALESCE(SUM(duration_minutes), 0)
-        FROM sessions
-        WHERE substr(start_time, 1, 10) = ?
-    """, (d,))
-    val = cur.fetchone()[0]
-    conn.close()
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT COALESCE(SUM(minutes), 0)
+            FROM daily_minutes
+            WHERE day = ?
+        """, (d,))
+        val = cur.fetchone()[0]
     return float(val or 0)
 
 
+@_cached("sessions")
+def get_daily_totals(start_date, end_date, activity: str = None):
+    """
+    Return [(YYYY-MM-DD, minutes)] per day with any sessions, oldest first.
+    One aggregated read of the daily_minutes rollup, optionally for one activity.
+    """
+    if hasattr(start_date, "isoformat"):
+        start_date = start_date.isoformat()
+    if hasattr(end_date, "isoformat"):
+        end_date = end_date.isoformat()
 
+    with connection() as conn:
+        cur = conn.cursor()
+        if activity:
+            cur.execute("""
+                SELECT day, minutes
+                FROM daily_minutes
+                WHERE day BETWEEN ? AND ? AND activity = ?
+                ORDER BY day
+            """, (start_date, end_date, activity))
+        else:
+            cur.execute("""
+                SELECT day, SUM(minutes)
+                FROM daily_minutes
+                WHERE day BETWEEN ? AND ?
+                GROUP BY day
+                ORDER BY day
+            """, (start_date, end_date))
+        return cur.fetchall()
+
+
+# Bucket start for each daily_minutes.day: the day itself, the Monday of its
+# ISO week, or the 1st of its month (all YYYY-MM-DD, so charts get dates).
+BUCKETS = {
+    "day": "day",
+    "week": "date(day, '-' || ((CAST(strftime('%w', day) AS INTEGER) + 6) % 7) || ' days')",
+    "month": "substr(day, 1, 7) || '-01'",
+}
+
+
+@_cached("sessions")
+def get_bucket_totals(start_date, end_date, bucket: str = "day", activity: str = None):
+    """
+    Return [(bucket start YYYY-MM-DD, minutes)] for buckets with any sessions,
+    oldest first: per day, ISO week or month, summed in SQL on the
+    daily_minutes rollup (at most one row per bucket leaves the DB).
+    """
+    if hasattr(start_date, "isoformat"):
+        start_date = start_date.isoformat()
+    if hasattr(end_date, "isoformat"):
+        end_date = end_date.isoformat()
+    expr = BUCKETS[bucket]
+
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute(f"""
+            SELECT {expr} AS bucket, SUM(minutes)
+            FROM daily_minutes
+            WHERE day BETWEEN ? AND ? {"AND activity = ?" if activity else ""}
+            GROUP BY bucket
+            ORDER BY bucket
+        """, (start_date, end_date, activity) if activity else (start_date, end_date))
+        return cur.fetchall()
+
+
+@_cached("sessions")
+def get_activity_totals(start_date, end_date):
+    """Return [(activity, minutes, sessions)] for the range, most minutes first."""
+    if hasattr(start_date, "isoformat"):
+        start_date = start_date.isoformat()
+    if hasattr(end_date, "isoformat"):
+        end_date = end_date.isoformat()
 
-def init_profile_table():
-    conn = get_conn()
-    cur = conn.cursor()
-
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS profile (
-            id INTEGER PRIMARY KEY CHECK (id = 1),
-            full_name TEXT,
-            nickname TEXT,
-            school TEXT,
-            year TEXT,
-            university TEXT,
-            email TEXT,
-            phone TEXT,
-            bio TEXT,
-            photo_path TEXT,
-            updated_at TEXT
-        )
-    """)
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT activity, SUM(minutes) AS total, SUM(sessions)
+            FROM daily_minutes
+            WHERE day BETWEEN ? AND ?
+            GROUP BY activity
+            ORDER BY total DESC
+        """, (start_date, end_date))
+        return cur.fetchall()
+
+
+@_cached("sessions")
+def get_activities():
+    """Return every activity label that has at least 1 session."""
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT DISTINCT activity FROM daily_minutes ORDER BY activity")
+        return [r[0] for r in cur.fetchall()]
+
+
+# -------------------------
+# Study streak
+# -------------------------
+# The full gaps-and-islands query runs once per process; after that
+# save_session extends the latest run in O(1). Anything that could split
+# or merge older runs just resets the state and the next call recomputes.
+_streak_lock = threading.Lock()
+_streak = {}  # DB file -> {"last_day", "run", "longest"}
+
+
+def _reset_streak(path: str = None):
+    with _streak_lock:
+        if path is None:
+            _streak.clear()
+        else:
+            _streak.pop(path, None)
+
+
+def _compute_streak():
+    with connection() as conn:
+        cur = conn.cursor()
+        # Consecutive days share the same (julianday - row_number) value.
+        cur.execute("""
+            WITH days AS (
+                SELECT DISTINCT day FROM daily_minutes
+            ),
+            islands AS (
+                SELECT day, julianday(day) - ROW_NUMBER() OVER (ORDER BY day) AS grp
+                FROM days
+            )
+            SELECT MAX(day) AS last_day, COUNT(*) AS run
+            FROM islands
+            GROUP BY grp
+            ORDER BY last_day DESC
+        """)
+        rows = cur.fetchall()
+
+    if not rows:
+        return {"last_day": None, "run": 0, "longest": 0}
+    return {
+        "last_day": date.fromisoformat(rows[0][0]),
+        "run": rows[0][1],
+        "longest": max(r[1] for r in rows),
+    }
+
+
+def _streak_add_day(day: date):
+    with _streak_lock:
+        state = _streak.get(db_path())
+        if state is None:
+            return  # nothing cached yet; next get_streak computes it
+
+        last = state["last_day"]
+        if last is None or day == last + timedelta(days=1):
+            state["run"] = state["run"] + 1 if last else 1
+        elif day > last:
+            state["run"] = 1
+        elif day < last:
+            del _streak[db_path()]  # back-dated day: may bridge older runs
+            return
+        else:
+            return  # same day as the latest run, nothing changes
+
+        state["last_day"] = day
+        state["longest"] = max(state["longest"], state["run"])
+
+
+def get_streak(today: date = None):
+    """Return (current, longest) streak in days with at least 1 session."""
+    if today is None:
+        today = date.today()
+
+    path = db_path()
+    migrate()
+    with _cache_lock:
+        _check_foreign_writes(path)
+    with _streak_lock:
+        state = _streak.get(path)
+    if state is None:
+        state = _compute_streak()
+        with _streak_lock:
+            state = _streak.setdefault(path, state)
+
+    last = state["last_day"]
+    # Today not logged yet doesn't break the streak until tomorrow.
+    current = state["run"] if last and last >= today - timedelta(days=1) else 0
+    return current, state["longest"]
 
-    # Ensure one row exists
-    cur.execute("INSERT OR IGNORE INTO profile (id) VALUES (1)")
 
-    conn.commit()
-    conn.close()
+def init_profile_table():
+    migrate()
 
 
+@_cached("profile")
 def get_profile():
-    conn = get_conn()
-    cur = conn.cursor()
+    with connection() as conn:
+        cur = conn.cursor()
 
-    cur.execute("""
-        SELECT full_name, nickname, school, year, university, email, phone, bio, photo_path, updated_at
-        FROM profile
-        WHERE id = 1
-    """)
-    row = cur.fetchone()
-    conn.close()
+        cur.execute("""
+            SELECT full_name, nickname, school, year, university, email, phone, bio, photo_path, updated_at
+            FROM profile
+            WHERE id = 1
+        """)
+        row = cur.fetchone()
 
     keys = ["full_name", "nickname", "school", "year", "university", "email", "phone",
             "bio", "photo_path", "updated_at"]
@@ -328,18 +2123,122 @@ def get_profile():
 
 def update_profile(full_name="", nickname="", school="", year="", university="",
                    email="", phone="", bio="", photo_path=""):
-    conn = get_conn()
-    cur = conn.cursor()
+    with connection() as conn:
+        cur = conn.cursor()
 
-    cur.execute("""
-        UPDATE profile
-        SET full_name = ?, nickname = ?, school = ?, year = ?, university = ?,
-            email = ?, phone = ?, bio = ?, photo_path = ?, updated_at = ?
-        WHERE id = 1
-    """, (
-        full_name, nickname, school, year, university,
-        email, phone, bio, photo_path, datetime.now().isoformat(timespec="seconds")
-    ))
-
-    conn.commit()
-    conn.close()
+        cur.execute("""
+            UPDATE profile
+            SET full_name = ?, nickname = ?, school = ?, year = ?, university = ?,
+                email = ?, phone = ?, bio = ?, photo_path = ?, updated_at = ?
+            WHERE id = 1
+        """, (
+            full_name, nickname, school, year, university,
+            email, phone, bio, photo_path, datetime.now().isoformat(timespec="seconds")
+        ))
+
+    _bump("profile")
+
+
+# -------------------------
+# Bulk import / export
+# -------------------------
+# Columns moved by import/export, in file order. Ids are not carried over.
+TABLE_COLUMNS = {
+    "sessions": ["activity", "start_time", "end_time", "duration_minutes"],
+    "questions": ["topic", "q_type", "question", "answer", "created_at",
+                  "correct_count", "wrong_count"],
+    "todos": ["todo_date", "task", "done", "created_at"],
+    "settings": ["key", "value"],
+}
+
+
+# questions stores topic_id and keeps answers in their own table; the files
+# carry the topic name and the plain answer text. Sessions read through the
+# compatibility view, which has no rowid.
+_EXPORT_SQL = {
+    "sessions": """
+        SELECT activity, start_time, end_time, duration_minutes
+        FROM sessions
+        ORDER BY id
+    """,
+    "questions": """
+        SELECT t.name, q.q_type, q.question, a.compressed, a.body, q.created_at,
+               q.correct_count, q.wrong_count
+        FROM questions q
+        JOIN topics t ON t.id = q.topic_id
+        LEFT JOIN answers a ON a.question_id = q.id
+        ORDER BY q.id
+    """,
+}
+
+
+def iter_rows(table: str, chunk_size: int = BULK_BATCH):
+    """Stream every row of `table` (TABLE_COLUMNS order) straight off a cursor."""
+    cols = TABLE_COLUMNS[table]
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute(_EXPORT_SQL.get(table) or f"SELECT {', '.join(cols)} FROM {table} ORDER BY rowid")
+        while True:
+            chunk = cur.fetchmany(chunk_size)
+            if not chunk:
+                break
+            if table == "questions":
+                chunk = [r[:3] + (_unpack_answer(r[3], r[4]),) + r[5:] for r in chunk]
+            yield from chunk
+
+
+def insert_many(table: str, rows, batch_size: int = BULK_BATCH) -> int:
+    """
+    Insert an iterable of TABLE_COLUMNS-ordered tuples, one executemany +
+    commit per batch (questions go row by row, they span two tables).
+    Settings rows overwrite existing keys.
+    Returns the number of rows written.
+    """
+    cols = TABLE_COLUMNS[table]
+    sql = f"""
+        INSERT INTO {table} ({', '.join(cols)})
+        VALUES ({', '.join('?' for _ in cols)})
+    """
+    if table == "settings":
+        sql += " ON CONFLICT(key) DO UPDATE SET value=excluded.value"
+
+    rows = iter(rows)
+    total = 0
+    try:
+        with connection() as conn:
+            topic_ids = {}  # name -> id, so each topic is looked up once
+            while True:
+                batch = list(islice(rows, batch_size))
+                if not batch:
+                    break
+                if table == "questions":
+                    # Two tables and a topic lookup per row: no executemany.
+                    cur = conn.cursor()
+                    for row in batch:
+                        key = row[0].strip()
+                        if key not in topic_ids:
+                            topic_ids[key] = _topic_id(cur, row[0])
+                        _insert_question(cur, topic_ids[key], *row[1:])
+                else:
+                    conn.executemany(sql, batch)
+                _commit(conn, db_path())
+                total += len(batch)
+    finally:
+        # Earlier batches are committed even if a later one fails.
+        _bump(table)
+        if table == "sessions":
+            _reset_streak(db_path())
+    return total
+
+
+def explain(sql: str):
+    """EXPLAIN QUERY PLAN for a (parameterized) statement, as plan detail lines."""
+    # Planning doesn't need real values; bind NULL to every placeholder.
+    sql = sql.replace("?, ...", "?")
+    try:
+        with connection() as conn:
+            cur = conn.cursor()
+            cur.execute("EXPLAIN QUERY PLAN " + sql, (None,) * sql.count("?"))
+            return [r[3] for r in cur.fetchall()]
+    except sqlite3.Error:
+        return []
@@ -0,0 +1,92 @@
+from datetime import date
+
+import numpy as np
+
+EPOCH = date(1970, 1, 1)
+
+# Minutes thresholds for the 5 colour levels (0 = nothing logged).
+LEVELS = [0, 30, 60, 120, 240]
+COLORS = ["#fbe7f0", "#ffc6de", "#ff9ac7", "#ff5fa2", "#d6337a"]
+
+
+def day_index(d: date) -> int:
+    """Days since 1970-01-01 (day-of-epoch)."""
+    return (d - EPOCH).days
+
+
+def daily_array(rows, start: date, end: date) -> np.ndarray:
+    """
+    Dense minutes-per-day array covering start..end (inclusive).
+    rows are [(YYYY-MM-DD, minutes)] as returned by db.get_daily_totals.
+    """
+    out = np.zeros(day_index(end) - day_index(start) + 1, dtype=np.float32)
+    if not rows:
+        return out
+
+    days, minutes = zip(*rows)
+    idx = np.array(days, dtype="datetime64[D]").astype(np.int64) - day_index(start)
+    out[idx] = np.asarray(minutes, dtype=np.float32)
+    return out
+
+
+def year_grid(values: np.ndarray, start: date, year: int) -> np.ndarray:
+    """
+    Slice one calendar year out of a daily array as a 7 x weeks grid
+    (rows Monday..Sunday). Days outside the year are NaN.
+    """
+    first = date(year, 1, 1)
+    last = date(year, 12, 31)
+    lo = day_index(first) - day_index(start)
+    hi = day_index(last) - day_index(start) + 1
+
+    year_values = np.full(hi - lo, np.nan, dtype=np.float32)
+    src_lo, src_hi = max(lo, 0), min(hi, len(values))
+    if src_lo < src_hi:
+        year_values[src_lo - lo:src_hi - lo] = values[src_lo:src_hi]
+
+    pad = first.weekday()
+    weeks = -(-(pad + len(year_values)) // 7)  # ceil
+    grid = np.full(weeks * 7, np.nan, dtype=np.float32)
+    grid[pad:pad + len(year_values)] = year_values
+    return grid.reshape(weeks, 7).T
+
+
+def year_html(grid: np.ndarray, year: int) -> str:
+    """Render a year grid as a small HTML/CSS calendar heatmap."""
+    levels = np.digitize(np.nan_to_num(grid), LEVELS[1:])
+    total = float(np.nansum(grid))
+    active = int(np.count_nonzero(np.nan_to_num(grid)))
+
+    first_ordinal = date(year, 1, 1).toordinal() - date(year, 1, 1).weekday()
+    cells = []
+    for w in range(grid.shape[1]):
+        for d in range(7):
+            v = grid[d, w]
+            if np.isnan(v):
+                cells.append('<div class="hm-cell hm-empty"></div>')
+                continue
+            day = date.fromordinal(first_ordinal + w * 7 + d)
+            cells.append(
+                f'<div class="hm-cell" style="background:{COLORS[levels[d, w]]}" '
+                f'title="{day.isoformat()}: {v:.0f} min"></div>'
+            )
+
+    return (
+        '<div class="hm-year">'
+        f'  <div class="hm-head"><b>{year}</b> · {total / 60:.1f} hrs · {active} active days</div>'
+        f'  <div class="hm-grid" style="grid-template-columns: repeat({grid.shape[1]}, 12px);">'
+        + "".join(cells) +
+        '  </div>'
+        '</div>'
+    )
+
+
+HEATMAP_CSS = """
+<style>
+.hm-year { margin: 8px 0 16px; overflow-x: auto; }
+.hm-head { font-weight: 700; color: rgba(60,40,50,0.80); margin-bottom: 6px; }
+.hm-grid { display: grid; grid-template-rows: repeat(7, 12px); grid-auto-flow: column; gap: 3px; }
+.hm-cell { width: 12px; height: 12px; border-radius: 3px; }
+.hm-empty { background: transparent; }
+</style>
+"""
@@ -0,0 +1,120 @@
+"""
+Small, dependency-free text helpers: tokenizing, pulling the "Core answer"
+out of a generated answer, and grading typed answers locally (no model
+call, works offline).
+"""
+import math
+import re
+from collections import Counter
+from functools import lru_cache
+
+# Reference terms per question flagged as keywords (the must-mention words).
+KEYWORDS_PER_QUESTION = 8
+
+# Grade = weighted mix of the three signals, then bucketed.
+OVERLAP_WEIGHT = 0.3
+COSINE_WEIGHT = 0.3
+COVERAGE_WEIGHT = 0.4
+CORRECT_AT = 0.6
+PARTIAL_AT = 0.35
+
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before
+being below between both but by can could did do does doing down during each either else
+few for from further had has have having he her here hers him his how i if in into is it its
+itself just may me might more most must my no nor not now of off on once only or other our
+out over own same she should so some such than that the their them then there these they
+this those through thus to too under until up very via was we were what when where which
+while who whom why will with within without would you your
+""".split())
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+
+# "Core answer:" up to the next "Heading:" line (Explanation:, Memory hook:, ...).
+_CORE_RE = re.compile(r"core answer\s*:\s*(.*?)(?=\n\s*[a-z][a-z /]{2,30}:|\Z)", re.I | re.S)
+_CORRECT_RE = re.compile(r"correct\s*:\s*(.*?)(?=\n|\Z)", re.I)
+
+
+def _stem(word: str) -> str:
+    """Very light suffix stripping so 'arteries'/'artery', 'dilated'/'dilates' match."""
+    if len(word) > 4:
+        if word.endswith("ies"):
+            return word[:-3] + "y"
+        for suffix in ("ing", "ed", "es", "s"):
+            if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+                return word[:-len(suffix)]
+    return word
+
+
+@lru_cache(maxsize=100_000)
+def _term(word: str):
+    # Vocabularies are small next to token counts: each word is stemmed once.
+    return None if word in STOPWORDS else _stem(word)
+
+
+def tokenize(text: str):
+    """Lowercased, stemmed content words of `text` (stopwords dropped)."""
+    return [t for t in map(_term, _TOKEN_RE.findall((text or "").lower())) if t]
+
+
+def core_answer(answer: str) -> str:
+    """
+    The part of a generated answer a typed response is graded against: the
+    "Core answer:" section, else the MCQ "Correct:" line, else the first
+    paragraph.
+    """
+    answer = answer or ""
+    match = _CORE_RE.search(answer) or _CORRECT_RE.search(answer)
+    if match and match.group(1).strip():
+        return match.group(1).strip()
+    return answer.strip().split("\n\n", 1)[0]
+
+
+def answer_terms(answer: str):
+    """[(term, tf, is_keyword)] of the core answer: the per-question grading key."""
+    counts = Counter(tokenize(core_answer(answer)))
+    # Most repeated first, longer (more specific) words break ties.
+    ranked = sorted(counts, key=lambda t: (-counts[t], -len(t), t))
+    keywords = {t for t in ranked[:KEYWORDS_PER_QUESTION] if not t.isdigit()}
+    return [(t, counts[t], int(t in keywords)) for t in ranked]
+
+
+def _idf(df: int, n_docs: int) -> float:
+    return math.log((1 + n_docs) / (1 + df)) + 1.0
+
+
+def grade(response: str, key, df: dict, n_docs: int) -> dict:
+    """
+    Grade a typed `response` against a question's key ([(term, tf, is_keyword)]
+    from answer_terms / db.get_answer_key). `df` maps terms to how many
+    questions use them, for IDF weighting.
+    """
+    ref = {term: tf for term, tf, _ in key}
+    keywords = {term for term, _, is_kw in key if is_kw}
+    got = Counter(tokenize(response))
+    if not ref:
+        return {"score": 0.0, "verdict": "ungradable", "overlap": 0.0, "cosine": 0.0,
+                "coverage": 0.0, "missing": []}
+
+    overlap = len(ref.keys() & got.keys()) / len(ref)
+
+    def weight(term, tf):
+        return tf * _idf(df.get(term, 0), n_docs)
+
+    dot = sum(weight(t, ref[t]) * weight(t, got[t]) for t in ref.keys() & got.keys())
+    norm_ref = math.sqrt(sum(weight(t, tf) ** 2 for t, tf in ref.items()))
+    norm_got = math.sqrt(sum(weight(t, tf) ** 2 for t, tf in got.items()))
+    cosine = dot / (norm_ref * norm_got) if norm_ref and norm_got else 0.0
+
+    missing = sorted(keywords - got.keys())
+    coverage = 1.0 - len(missing) / len(keywords) if keywords else overlap
+
+    score = OVERLAP_WEIGHT * overlap + COSINE_WEIGHT * cosine + COVERAGE_WEIGHT * coverage
+    if score >= CORRECT_AT:
+        verdict = "correct"
+    elif score >= PARTIAL_AT:
+        verdict = "partial"
+    else:
+        verdict = "incorrect"
+    return {"score": score, "verdict": verdict, "overlap": overlap, "cosine": cosine,
+            "coverage": coverage, "missing": missing}
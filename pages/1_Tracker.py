@@ -1,13 +1,10 @@
 import streamlit as st
 from datetime import datetime
-import pandas as pd
 
 from db import init_db, save_session, get_today_sessions
 from ui import apply_girly_theme
 apply_girly_theme()
 
-from streamlit_autorefresh import st_autorefresh
-
 # -------------------------
 # Modern CSS (Tracker)
 # -------------------------
@@ -188,18 +185,18 @@ st.write("")
 # -------------------------
 is_running = bool(st.session_state.current_activity and st.session_state.start_time)
 
-# refresh only when running and not paused
-if is_running and not st.session_state.paused:
-    st_autorefresh(interval=1000, key="tracker_tick")
+# Only the timer fragment ticks; the rest of the page reruns on user actions.
+ticking = is_running and not st.session_state.paused
 
-if is_running:
+
+@st.fragment(run_every=1 if ticking else None)
+def _live_timer(target: int):
     elapsed_sec = _effective_elapsed_seconds()
     elapsed_h = int(elapsed_sec // 3600)
     elapsed_m = int((elapsed_sec % 3600) // 60)
     elapsed_s = int(elapsed_sec % 60)
     elapsed_str = f"{elapsed_h:02d}:{elapsed_m:02d}:{elapsed_s:02d}"
 
-    target = st.selectbox("Session target (minutes)", [15, 25, 30, 45, 60, 90, 120], index=1)
     target_sec = float(target) * 60.0
     progress = min(1.0, elapsed_sec / target_sec) if target_sec > 0 else 0.0
     pct = int(progress * 100)
@@ -230,6 +227,11 @@ if is_running:
 
     st.progress(progress)
 
+
+if is_running:
+    target = st.selectbox("Session target (minutes)", [15, 25, 30, 45, 60, 90, 120], index=1)
+    _live_timer(target)
+
     # Controls
     a, b, c, d = st.columns([1,1,1,2])
 
@@ -282,9 +284,11 @@ rows = get_today_sessions()
 if not rows:
     st.write("No sessions saved today yet.")
 else:
-    df = pd.DataFrame(rows, columns=["Activity", "Start", "End", "Minutes"])
-    st.dataframe(df, use_container_width=True, hide_index=True)
+    cols = ["Activity", "Start", "End", "Minutes"]
+    st.dataframe([dict(zip(cols, r)) for r in rows], use_container_width=True, hide_index=True)
 
-    totals = df.groupby("Activity")["Minutes"].sum().sort_values(ascending=False)
+    totals = {}
+    for act, _start, _end, minutes in rows:
+        totals[act] = totals.get(act, 0.0) + minutes
     st.markdown('<div class="h2ish">✅ Today’s Totals (minutes)</div>', unsafe_allow_html=True)
-    st.bar_chart(totals)
+    st.bar_chart({"Activity": list(totals), "Minutes": list(totals.values())}, x="Activity", y="Minutes")
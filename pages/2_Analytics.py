@@ -1,8 +1,10 @@
 import streamlit as st
-import pandas as pd
 from datetime import date, timedelta
 
-from db import init_db, get_sessions_between
+from db import (init_db, get_daily_totals, get_activities, get_bucket_totals,
+                get_activity_totals, get_session_page)
+from heatmap import HEATMAP_CSS, daily_array, year_grid, year_html
+from perf import lazy_import
 from ui import apply_girly_theme
 apply_girly_theme()
 
@@ -11,12 +13,38 @@ st.title("📊 Analytics (Weekly / Monthly)")
 
 init_db()
 
-# Default range: last 7 days
 today = date.today()
+
+# -------------------------
+# Year at a glance (heatmap)
+# -------------------------
+st.subheader("🗓️ Year at a Glance")
+
+hm1, hm2 = st.columns(2)
+with hm1:
+    hm_activity = st.selectbox("Activity", ["All"] + get_activities())
+with hm2:
+    hm_years = st.slider("Years", min_value=1, max_value=5, value=3)
+
+hm_start = date(today.year - hm_years + 1, 1, 1)
+hm_rows = get_daily_totals(hm_start, today, None if hm_activity == "All" else hm_activity)
+hm_values = daily_array(hm_rows, hm_start, today)
+
+st.markdown(
+    HEATMAP_CSS + "".join(
+        year_html(year_grid(hm_values, hm_start, y), y)
+        for y in range(today.year, hm_start.year - 1, -1)
+    ),
+    unsafe_allow_html=True,
+)
+
+st.divider()
+
+# Default range: last 7 days
 default_start = today - timedelta(days=6)
 default_end = today
 
-col1, col2 = st.columns(2)
+col1, col2, col3 = st.columns([1, 1, 1.3])
 with col1:
     start_date = st.date_input("Start date", value=default_start)
 with col2:
@@ -26,36 +54,94 @@ if start_date > end_date:
     st.error("Start date must be before end date.")
     st.stop()
 
-rows = get_sessions_between(start_date, end_date)
+# Coarser default buckets for longer ranges keep the chart to ~100 points,
+# until the student picks one; the pick outlives range changes and page switches.
+BUCKET_LABELS = {"day": "Daily", "week": "Weekly", "month": "Monthly"}
+span = (end_date - start_date).days + 1
+default_bucket = "day" if span <= 92 else "week" if span <= 731 else "month"
 
-st.divider()
-st.subheader("🧾 Sessions in Range")
 
-if not rows:
-    st.write("No sessions found in this range.")
-    st.stop()
+def _remember_bucket():
+    st.session_state.bucket_pick = st.session_state.analytics_bucket
 
-df = pd.DataFrame(rows, columns=["Activity", "Start", "End", "Minutes"])
 
-# Add a Date column for grouping
-df["Date"] = df["Start"].str.slice(0, 10)
+st.session_state.analytics_bucket = st.session_state.get("bucket_pick", default_bucket)
+with col3:
+    bucket = st.radio(
+        "Group by", list(BUCKET_LABELS), format_func=BUCKET_LABELS.get, horizontal=True,
+        key="analytics_bucket", on_change=_remember_bucket,
+    )
 
-st.dataframe(df, use_container_width=True)
+# Everything below is summed in SQL on the daily rollup; only the
+# bucketed series and per-activity totals come back.
+totals = get_activity_totals(start_date, end_date)
 
 st.divider()
 
+if not totals:
+    st.write("No sessions found in this range.")
+    st.stop()
+
+pd = lazy_import("pandas")
+
 # Totals per activity
 st.subheader("✅ Totals per Activity (minutes)")
-totals = df.groupby("Activity")["Minutes"].sum().sort_values(ascending=False)
-st.bar_chart(totals)
-
-# Daily totals trend
-st.subheader("📅 Daily Total Minutes (trend)")
-daily = df.groupby("Date")["Minutes"].sum().sort_index()
-st.line_chart(daily)
+st.bar_chart(pd.DataFrame(totals, columns=["Activity", "Minutes", "Sessions"]).set_index("Activity")["Minutes"])
+
+# Bucketed trend (empty buckets shown as 0)
+st.subheader(f"📅 {BUCKET_LABELS[bucket]} Total Minutes (trend)")
+trend = pd.Series(dict(get_bucket_totals(start_date, end_date, bucket)), dtype=float)
+trend.index = pd.to_datetime(trend.index)
+first = pd.Timestamp(start_date)
+if bucket == "week":
+    first -= pd.Timedelta(days=first.weekday())
+elif bucket == "month":
+    first = first.replace(day=1)
+freq = {"day": "D", "week": "W-MON", "month": "MS"}[bucket]
+trend = trend.reindex(pd.date_range(first, pd.Timestamp(end_date), freq=freq), fill_value=0.0)
+st.line_chart(trend.rename("Minutes"))
 
 # Summary stats
 st.subheader("📌 Summary")
-total_minutes = df["Minutes"].sum()
-st.metric("Total minutes", f"{total_minutes:.1f}")
-st.metric("Total hours", f"{total_minutes/60:.2f}")
+total_minutes = sum(t[1] for t in totals)
+m1, m2, m3 = st.columns(3)
+m1.metric("Total minutes", f"{total_minutes:.1f}")
+m2.metric("Total hours", f"{total_minutes/60:.2f}")
+m3.metric("Sessions", f"{sum(t[2] for t in totals):,}")
+
+st.divider()
+
+# -------------------------
+# Sessions in range (one page at a time)
+# -------------------------
+st.subheader("🧾 Sessions in Range")
+PAGE_SIZE = 50
+
+# Keyset cursors, as on the History page; a new range starts over.
+range_key = (start_date.isoformat(), end_date.isoformat())
+if st.session_state.get("analytics_range") != range_key:
+    st.session_state.analytics_range = range_key
+    st.session_state.analytics_cursors = [None]
+cursors = st.session_state.analytics_cursors
+
+rows = get_session_page(before=cursors[-1], limit=PAGE_SIZE + 1,
+                        start_date=range_key[0], end_date=range_key[1])
+has_older = len(rows) > PAGE_SIZE
+rows = rows[:PAGE_SIZE]
+
+st.dataframe(
+    pd.DataFrame([r[1:] for r in rows], columns=["Activity", "Start", "End", "Minutes"]),
+    width="stretch", hide_index=True,
+)
+
+nav1, nav2, nav3 = st.columns([1, 1, 2])
+with nav1:
+    if st.button("⬅️ Newer", disabled=len(cursors) == 1):
+        cursors.pop()
+        st.rerun()
+with nav2:
+    if st.button("Older ➡️", disabled=not has_older):
+        cursors.append((rows[-1][2], rows[-1][0]))
+        st.rerun()
+with nav3:
+    st.caption(f"Page {len(cursors)} · edit or delete sessions on the History page")
@@ -1,35 +1,39 @@
 from db import delete_all_questions
 import streamlit as st
-import pandas as pd
-from random import choice
-import json
 import os
 from datetime import datetime
 from io import BytesIO
 
-from openai import OpenAI
-
-from db import init_db, init_questions_table, add_question, get_questions, mark_answer
+from ai import generate_questions_from_notes
+from db import (init_db, init_questions_table, get_questions, get_question_count, get_topics,
+                get_weakest_topics, get_note, diff_note, save_note, get_answer_key, get_term_df,
+                get_cards)
+from nlp import grade, tokenize
+from perf import lazy_import
+from quiz import Deck, QuestionPrefetcher, record_answers
+from related import get_index
 from ui import apply_girly_theme
 apply_girly_theme()
 
-# PDF tools (reportlab)
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib.units import inch
-
 st.title("🧠 Practice Questions (AI)")
 
 # --- DB setup
 init_db()
 init_questions_table()
 
-# --- OpenAI client setup (from Streamlit secrets)
-if "OPENAI_API_KEY" in st.secrets:
-    os.environ["OPENAI_API_KEY"] = st.secrets["OPENAI_API_KEY"]
 
-client = OpenAI()
+# -------------------------
+# Process-wide resources (built on first use, shared by every rerun/session)
+# -------------------------
+def _load_api_key():
+    """OpenAI key from Streamlit secrets (ai.get_client reads the env var)."""
+    if "OPENAI_API_KEY" in st.secrets:
+        os.environ["OPENAI_API_KEY"] = st.secrets["OPENAI_API_KEY"]
+
+
+@st.cache_resource
+def _pdf_styles():
+    return lazy_import("reportlab.lib.styles").getSampleStyleSheet()
 
 
 # -------------------------
@@ -42,8 +46,14 @@ def build_revision_pdf(topic: str, notes: str, questions: list) -> bytes:
     - Notes
     - Generated questions + answers
     """
+    # PDF tools (reportlab), only loaded when a PDF is actually built
+    platypus = lazy_import("reportlab.platypus")
+    Paragraph, Spacer, PageBreak = platypus.Paragraph, platypus.Spacer, platypus.PageBreak
+    letter = lazy_import("reportlab.lib.pagesizes").letter
+    inch = lazy_import("reportlab.lib.units").inch
+
     buf = BytesIO()
-    doc = SimpleDocTemplate(
+    doc = platypus.SimpleDocTemplate(
         buf,
         pagesize=letter,
         rightMargin=0.8 * inch,
@@ -53,7 +63,7 @@ def build_revision_pdf(topic: str, notes: str, questions: list) -> bytes:
         title=f"{topic} - Revision Pack"
     )
 
-    styles = getSampleStyleSheet()
+    styles = _pdf_styles()
     H = styles["Heading1"]
     H2 = styles["Heading2"]
     P = styles["BodyText"]
@@ -110,95 +120,37 @@ def build_revision_pdf(topic: str, notes: str, questions: list) -> bytes:
 
 
 # -------------------------
-# AI generator
+# Local grading (typed Short Answer responses, no model call)
 # -------------------------
-def generate_questions_from_notes(topic: str, notes: str, n_mcq: int, n_short: int):
-    schema = {
-        "name": "question_pack",
-        "schema": {
-            "type": "object",
-            "properties": {
-                "questions": {
-                    "type": "array",
-                    "items": {
-                        "type": "object",
-                        "properties": {
-                            "q_type": {"type": "string", "enum": ["MCQ", "Short Answer"]},
-                            "question": {"type": "string"},
-                            "answer": {"type": "string"},
-                            "choices": {"type": "array", "items": {"type": "string"}},
-                            "correct_choice_index": {"type": "integer", "minimum": 0, "maximum": 3},
-                        },
-                        "required": ["q_type", "question", "answer", "choices", "correct_choice_index"],
-                        "additionalProperties": False,
-                    },
-                }
-            },
-            "required": ["questions"],
-            "additionalProperties": False,
-        },
-    }
-
-    # 🔥 Upgraded prompt for high-quality, memorable answers
-    prompt = f"""
-You are an MBBS final-year exam tutor and question writer.
-
-ONLY use information found in the notes. Do NOT invent facts.
-If a detail is missing in the notes, write: "Not in notes."
-
-Topic: {topic}
-
-Return JSON that matches the schema exactly.
-
-You must generate:
-- {n_mcq} MCQs
-- {n_short} Short Answer questions
-
-Formatting rules (IMPORTANT):
-1) For EVERY question object, ALWAYS include: q_type, question, answer, choices, correct_choice_index.
-2) MCQ:
-   - choices MUST have exactly 4 options.
-   - correct_choice_index MUST be 0-3.
-   - answer MUST be LONG and include all of:
-     - "Correct: <A/B/C/D> — <correct option text>"
-     - "Explanation:" (high-yield, step-by-step)
-     - "Why others are wrong:" (1 line per option)
-     - "Memory hook / mnemonic:" (short but sticky)
-     - "Exam trap:" (common confusion)
-3) Short Answer:
-   - choices MUST be [] and correct_choice_index MUST be 0.
-   - answer MUST be LONG and include all of:
-     - "Core answer:" (direct exam-style)
-     - "Explanation:" (breakdown from the notes)
-     - "Memory hook:" (sticky recall)
-     - "Exam trap:" (common mistake)
-     - "Mini self-check:" (1 quick question to test recall)
-
-Notes:
-{notes}
-""".strip()
-
-    resp = client.responses.create(
-        model="gpt-4o-mini",
-        input=prompt,
-        text={
-            "format": {
-                "type": "json_schema",
-                "name": "question_pack",
-                "strict": True,
-                "schema": schema["schema"],
-            }
-        },
-    )
-
-    data = json.loads(resp.output_text)
-    return data["questions"]
+VERDICTS = {
+    "correct": "✅ Looks correct",
+    "partial": "🟡 Partly there",
+    "incorrect": "❌ Not quite",
+    "ungradable": "🤷 No core answer to compare with",
+}
+
+
+def typed_answer_box(q_id: int, key_prefix: str):
+    """Optional typed answer, graded against the question's "Core answer"."""
+    typed = st.text_area("✍️ Type your answer (optional, graded instantly offline)",
+                         key=f"{key_prefix}_typed_{q_id}", height=100)
+    if st.button("🔎 Check my answer", key=f"{key_prefix}_check_{q_id}") and typed.strip():
+        key = get_answer_key(q_id)
+        df = get_term_df(tokenize(typed) + [term for term, _, _ in key])
+        result = grade(typed, key, df, get_question_count())
+        st.markdown(
+            f"**{VERDICTS[result['verdict']]}** — score {result['score']:.0%} "
+            f"(key terms {result['coverage']:.0%}, overlap {result['overlap']:.0%}, "
+            f"similarity {result['cosine']:.0%})"
+        )
+        if result["missing"]:
+            st.caption("Missing key terms: " + ", ".join(result["missing"]))
 
 
 # -------------------------
 # UI tabs
 # -------------------------
-tab1, tab2 = st.tabs(["⚡ AI Generate", "🎯 Quiz Mode"])
+tab1, tab2, tab3 = st.tabs(["⚡ AI Generate", "🎯 Quiz Mode", "🧭 Concepts"])
 
 
 # -------------------------
@@ -207,8 +159,18 @@ tab1, tab2 = st.tabs(["⚡ AI Generate", "🎯 Quiz Mode"])
 with tab1:
     st.subheader("Generate questions from your notes (AI)")
 
-    topic = st.text_input("Topic", value="General")
-    notes = st.text_area("Paste notes here", height=220, placeholder="Paste lecture notes or high-yield summary...")
+    # Existing topics to pick from; typing a new name creates it on save.
+    topic = st.selectbox(
+        "Topic", get_topics() or ["General"], accept_new_options=True,
+        placeholder="Pick a topic or type a new one",
+    ) or "General"
+    # Notes are saved per topic; switching topic loads that topic's notes.
+    saved_notes = get_note(topic)
+    notes = st.text_area("Paste notes here", value=saved_notes, key=f"notes_{topic}", height=220,
+                         placeholder="Paste lecture notes or high-yield summary...")
+    if saved_notes:
+        st.caption("📚 Saved notes loaded. Only new or edited paragraphs go to the AI; "
+                   "questions from paragraphs you delete are retired.")
 
     colA, colB = st.columns(2)
     with colA:
@@ -223,21 +185,32 @@ with tab1:
         if not notes.strip():
             st.error("Paste some notes first.")
         else:
-            with st.spinner("Generating high-yield questions + proper answers..."):
-                qs = generate_questions_from_notes(topic.strip(), notes.strip(), int(n_mcq), int(n_short))
-
-            # Save all generated into DB
-            for q in qs:
-                add_question(topic.strip(), q.get("q_type", "Short Answer"), q["question"], q["answer"])
+            new_paragraphs, retiring = diff_note(topic, notes)
+
+            qs = []
+            if new_paragraphs:
+                _load_api_key()
+                with st.spinner(f"Generating from {len(new_paragraphs)} new/edited paragraph(s)..."):
+                    qs = generate_questions_from_notes(
+                        topic.strip(), notes.strip(), int(n_mcq), int(n_short),
+                        paragraphs=[p for _, p in new_paragraphs],
+                    )
+
+            # Notes, new questions and retirements are saved together
+            retired = save_note(topic, notes, [
+                (new_paragraphs[q["source"]][0], q.get("q_type", "Short Answer"), q["question"], q["answer"])
+                for q in qs
+            ])
 
             # Save for PDF download + preview
-            st.session_state.last_generated = {
-                "topic": topic.strip(),
-                "notes": notes.strip(),
-                "questions": qs
-            }
+            if qs:
+                st.session_state.last_generated = {
+                    "topic": topic.strip(),
+                    "notes": notes.strip(),
+                    "questions": qs
+                }
 
-            st.success(f"Saved {len(qs)} questions ✅")
+            st.success(f"Saved {len(qs)} questions, retired {retired} ✅")
             st.rerun()
 
     # --- Show generated preview + PDF download
@@ -258,11 +231,10 @@ with tab1:
             with st.expander("Show full answer (high-yield)"):
                 st.write(q["answer"])
 
-        # PDF download
-        pdf_bytes = build_revision_pdf(pack["topic"], pack["notes"], pack["questions"])
+        # PDF download (built only when clicked, not on every rerun)
         st.download_button(
             "📄 Download Revision PDF (notes + Q&A)",
-            data=pdf_bytes,
+            data=lambda: build_revision_pdf(pack["topic"], pack["notes"], pack["questions"]),
             file_name=f"{pack['topic']}_revision_pack.pdf".replace(" ", "_"),
             mime="application/pdf",
             type="primary"
@@ -271,10 +243,10 @@ with tab1:
     st.divider()
     st.subheader("📚 Question Bank Preview (latest 20)")
 
-    rows = get_questions(None)
+    rows = get_questions(None, limit=20)
     if rows:
-        df = pd.DataFrame(rows[:20], columns=["ID", "Topic", "Type", "Question", "Answer", "Created", "Correct", "Wrong"])
-        st.dataframe(df, use_container_width=True)
+        cols = ["ID", "Topic", "Type", "Question", "Created", "Correct", "Wrong"]
+        st.dataframe([dict(zip(cols, r)) for r in rows], use_container_width=True)
     else:
         st.write("No questions yet. Generate some above.")
 
@@ -283,6 +255,8 @@ with tab1:
 
     if st.button("🗑️ Delete ALL questions", type="secondary"):
         delete_all_questions()
+        if "quiz_prefetch" in st.session_state:
+            st.session_state.pop("quiz_prefetch").close()
         st.success("All questions deleted.")
         st.rerun()
 
@@ -293,42 +267,153 @@ with tab1:
 with tab2:
     st.subheader("Quiz yourself (fast recall)")
 
-    filter_topic = st.text_input("Filter topic (optional)", placeholder="Leave blank to quiz everything")
-
-    rows = get_questions(filter_topic if filter_topic else None)
-    if not rows:
-        st.info("No questions available for this topic yet.")
-        st.stop()
+    weakest = get_weakest_topics(limit=5)
+    if weakest:
+        with st.expander("📉 Weakest topics", expanded=False):
+            for w_topic, accuracy, w_correct, w_wrong, last in weakest:
+                last_txt = f" · last practiced {last[:10]}" if last else ""
+                st.markdown(f"**{w_topic}** — {accuracy:.0%} ({w_correct}✅ / {w_wrong}❌){last_txt}")
+                st.progress(accuracy)
 
-    if "quiz_q" not in st.session_state:
-        st.session_state.quiz_q = None
+    filter_topic = st.selectbox("Filter topic (optional)", get_topics(), index=None,
+                                placeholder="All topics")
 
-    if st.button("🎲 Give me a question"):
-        st.session_state.quiz_q = choice(rows)
+    # A new filter (or student) drops the old background queue.
+    stale = st.session_state.get("quiz_prefetch")
+    if stale is not None and not stale.matches(filter_topic):
+        st.session_state.pop("quiz_prefetch").close()
 
-    if st.session_state.quiz_q is None:
-        st.write("Click **Give me a question** to start.")
+    if not get_question_count():
+        st.info("No questions yet. Generate some in the AI Generate tab.")
     else:
-        q_id, topic, q_type, q_text, a_text, created, correct, wrong = st.session_state.quiz_q
+        mode = st.radio("Mode", ["🎲 One at a time", "🃏 Deck"], horizontal=True)
 
-        st.markdown(f"### 📝 {q_type} — *{topic}*")
-        st.write(q_text)
+        if mode == "🎲 One at a time":
+            if "quiz_q" not in st.session_state:
+                st.session_state.quiz_q = None
 
-        with st.expander("Show Answer (full explanation)"):
-            st.write(a_text)
+            if st.button("🎲 Give me a question"):
+                # Upcoming questions load in the background from the first ask on.
+                if "quiz_prefetch" not in st.session_state:
+                    st.session_state.quiz_prefetch = QuestionPrefetcher(filter_topic)
+                st.session_state.quiz_q = st.session_state.quiz_prefetch.next()
 
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            if st.button("✅ I got it"):
-                mark_answer(q_id, True)
-                st.session_state.quiz_q = None
-                st.toast("Logged ✅", icon="✅")
-                st.rerun()
-        with col2:
-            if st.button("❌ I missed it"):
-                mark_answer(q_id, False)
-                st.session_state.quiz_q = None
-                st.toast("Logged ❌", icon="❌")
-                st.rerun()
-        with col3:
-            st.caption(f"Stats: ✅ {correct} | ❌ {wrong}")
+            if st.session_state.quiz_q is None:
+                st.write("Click **Give me a question** to start.")
+            else:
+                (q_id, topic, q_type, q_text, created, correct, wrong), a_text = st.session_state.quiz_q
+
+                st.markdown(f"### 📝 {q_type} — *{topic}*")
+                st.write(q_text)
+
+                if q_type == "Short Answer":
+                    typed_answer_box(q_id, "single")
+
+                # Prefetched with the question, so opening this costs nothing.
+                with st.expander("Show Answer (full explanation)"):
+                    st.write(a_text)
+
+                # Looked up only while open (the first lookup builds the index).
+                related = st.expander("🔗 Related questions", key=f"related_{q_id}", on_change="rerun")
+                if related.open:
+                    with related:
+                        matches = get_index().related(q_id, k=5)
+                        if not matches:
+                            st.caption("Nothing similar in your bank yet.")
+                        scores = dict(matches)
+                        for (r_id, r_topic, r_type, r_text, *_), _ in get_cards(scores):
+                            st.markdown(f"- *{r_topic}* · {r_type} — {r_text} ({scores[r_id]:.0%} similar)")
+
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    if st.button("✅ I got it"):
+                        record_answers([(q_id, True)])
+                        st.session_state.quiz_q = None
+                        st.toast("Logged ✅", icon="✅")
+                        st.rerun()
+                with col2:
+                    if st.button("❌ I missed it"):
+                        record_answers([(q_id, False)])
+                        st.session_state.quiz_q = None
+                        st.toast("Logged ❌", icon="❌")
+                        st.rerun()
+                with col3:
+                    st.caption(f"Stats: ✅ {correct} | ❌ {wrong}")
+
+        else:
+            # Answers are kept in the deck and written in one commit at the end.
+            deck = st.session_state.get("quiz_deck")
+
+            if deck is None:
+                size = st.slider("Cards in deck", min_value=20, max_value=50, value=20, step=5)
+                if st.button("🃏 Start deck", type="primary"):
+                    st.session_state.quiz_deck = Deck(filter_topic, size)
+                    st.rerun()
+
+            elif deck.done:
+                st.subheader("🏁 Deck finished")
+                if deck.pos:
+                    st.metric("Score", f"{deck.correct}/{deck.pos}", f"{deck.correct / deck.pos:.0%}")
+                else:
+                    st.write("No cards answered.")
+                if deck.missed:
+                    st.markdown("**Review these:**")
+                    for _, m_topic, _, m_text, *_ in deck.missed:
+                        st.markdown(f"- *{m_topic}* — {m_text}")
+                if st.button("🔁 New deck", type="primary"):
+                    del st.session_state.quiz_deck
+                    st.rerun()
+
+            else:
+                (q_id, topic, q_type, q_text, created, correct, wrong), a_text = deck.current()
+
+                st.progress(deck.pos / len(deck.cards),
+                            text=f"Card {deck.pos + 1} of {len(deck.cards)} · ✅ {deck.correct}")
+                st.markdown(f"### 📝 {q_type} — *{topic}*")
+                st.write(q_text)
+
+                if q_type == "Short Answer":
+                    typed_answer_box(q_id, "deck")
+
+                with st.expander("Show Answer (full explanation)"):
+                    st.write(a_text)
+
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    if st.button("✅ I got it", key="deck_correct"):
+                        deck.answer(True)
+                        st.rerun()
+                with col2:
+                    if st.button("❌ I missed it", key="deck_wrong"):
+                        deck.answer(False)
+                        st.rerun()
+                with col3:
+                    if st.button("⏹️ End deck"):
+                        deck.finish()
+                        st.rerun()
+
+
+# -------------------------
+# TAB 3: CONCEPTS
+# -------------------------
+with tab3:
+    st.subheader("Concepts across your bank")
+    st.caption("Questions grouped by the words they share (TF-IDF + k-means, computed locally).")
+
+    k = st.slider("How many concept groups?", min_value=2, max_value=20, value=8)
+    if st.button("🧭 Find concepts", type="primary"):
+        if not get_question_count():
+            st.info("No questions yet. Generate some in the AI Generate tab.")
+        else:
+            with st.spinner("Grouping questions..."):
+                st.session_state.concepts = get_index().clusters(k)
+
+    for i, group in enumerate(st.session_state.get("concepts") or [], start=1):
+        mix = " · ".join(f"{t} ({n})" for t, n in group["topics"].most_common(4))
+        st.markdown(f"**{i}. {', '.join(group['terms']) or '—'}** — {len(group['ids'])} questions")
+        st.caption(f"Topics: {mix}")
+        samples = st.expander("Sample questions", key=f"concept_{i}", on_change="rerun")
+        if samples.open:
+            with samples:
+                for (_, c_topic, _, c_text, *_), _ in get_cards(group["ids"][:10]):
+                    st.markdown(f"- *{c_topic}* — {c_text}")
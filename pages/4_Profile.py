@@ -4,7 +4,8 @@ import json
 import base64
 from pathlib import Path
 
-from db import init_db, init_profile_table, get_profile, update_profile
+from db import init_db, init_profile_table, get_profile, update_profile, current_user
+from ui import bind_user, query_diagnostics
 
 # -------------------------
 # Page config
@@ -65,22 +66,26 @@ def circular_avatar_from_file(photo_path: str, size: int = 190):
 
 def save_uploaded_photo(uploaded_file) -> str:
     """
-    Save uploaded image into /assets/profile/ and return saved file path.
+    Save uploaded image into /assets/profile/ (one folder per student) and
+    return saved file path.
     """
-    ensure_dir("assets/profile")
+    folder = Path("assets/profile") / (current_user() or "")
+    ensure_dir(str(folder))
     ext = Path(uploaded_file.name).suffix.lower()
     if ext not in [".png", ".jpg", ".jpeg", ".webp"]:
         ext = ".png"
 
-    out_path = Path("assets/profile/profile_pic" + ext)
+    out_path = folder / ("profile_pic" + ext)
     out_path.write_bytes(uploaded_file.getbuffer())
     return str(out_path)
 
 # -------------------------
 # DB init + Load profile
 # -------------------------
+bind_user()
 init_db()
 init_profile_table()
+query_diagnostics()
 
 profile = get_profile() or {}  # if DB returns None, use empty dict
 
@@ -0,0 +1,77 @@
+import io
+import tempfile
+import streamlit as st
+
+from db import init_db, TABLE_COLUMNS, current_user, user_context
+from transfer import FORMATS, export_table, guess_format, import_table
+from ui import apply_girly_theme
+apply_girly_theme()
+
+st.title("💾 Import / Export")
+st.caption("Back up your sessions, questions, todos and settings, or load them from a file (CSV or NDJSON).")
+
+init_db()
+
+tables = list(TABLE_COLUMNS)
+
+# -------------------------
+# Export
+# -------------------------
+st.subheader("📤 Export")
+
+col1, col2 = st.columns(2)
+with col1:
+    ex_table = st.selectbox("What to export", tables, key="ex_table")
+with col2:
+    ex_fmt = st.selectbox("Format", FORMATS, key="ex_fmt")
+
+
+def _export_data(table=ex_table, fmt=ex_fmt, user=current_user()):
+    # Runs on Streamlit's download thread, which doesn't carry our user context.
+    # Rows stream from the cursor to a temp file; Streamlit then needs the
+    # finished file as one bytes object, read back here in a single copy.
+    with user_context(user), tempfile.TemporaryFile() as f:
+        out = io.TextIOWrapper(f, encoding="utf-8", newline="")
+        export_table(table, fmt, out)
+        out.detach()  # flushes, and leaves f open for reading
+        f.seek(0)
+        return f.read()
+
+
+# Built only when the button is clicked, not on every rerun.
+st.download_button(
+    f"⬇️ Download {ex_table}.{ex_fmt}",
+    data=_export_data,
+    file_name=f"{ex_table}.{ex_fmt}",
+    mime="text/csv" if ex_fmt == "csv" else "application/x-ndjson",
+    type="primary",
+)
+st.caption(
+    "The browser download is held in memory while it's served. For very large tables, "
+    "use `python transfer.py export <table> -o <file>`, which streams straight to disk."
+)
+
+st.divider()
+
+# -------------------------
+# Import
+# -------------------------
+st.subheader("📥 Import")
+st.caption("Columns / keys: " + " · ".join(f"**{t}**: {', '.join(c)}" for t, c in TABLE_COLUMNS.items()))
+
+im_table = st.selectbox("Import into", tables, key="im_table")
+uploaded = st.file_uploader("CSV or NDJSON file", type=["csv", "ndjson", "jsonl", "json"])
+
+if uploaded is not None and st.button("✨ Import rows", type="primary"):
+    fmt = guess_format(uploaded.name)
+    # utf-8-sig drops the BOM spreadsheet apps put in front of the header.
+    lines = io.TextIOWrapper(uploaded, encoding="utf-8-sig", newline="")
+
+    with st.spinner("Importing..."):
+        report = import_table(im_table, lines, fmt)
+
+    st.success(f"Imported {report['imported']} rows ✅")
+    if report["skipped"]:
+        st.warning(f"Skipped {report['skipped']} invalid rows.")
+        for n, msg in report["errors"]:
+            st.caption(f"Line {n}: {msg}")
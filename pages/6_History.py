@@ -0,0 +1,123 @@
+import streamlit as st
+from datetime import datetime
+
+from db import init_db, get_activities, get_session_page, apply_session_changes
+from ui import apply_girly_theme
+apply_girly_theme()
+
+st.title("🗂️ Session History")
+st.caption("Every session you've tracked, newest first. Edit or delete rows, then save.")
+
+init_db()
+
+PAGE_SIZES = [25, 50, 100]
+
+# -------------------------
+# Filters (applied in SQL)
+# -------------------------
+col1, col2, col3, col4 = st.columns([1.4, 1, 1, 0.8])
+with col1:
+    activity = st.selectbox("Activity", ["All"] + get_activities())
+with col2:
+    start_date = st.date_input("From", value=None)
+with col3:
+    end_date = st.date_input("To", value=None)
+with col4:
+    page_size = st.selectbox("Rows", PAGE_SIZES, index=1)
+
+if start_date and end_date and start_date > end_date:
+    st.error("Start date must be before end date.")
+    st.stop()
+
+filters = dict(
+    activity=None if activity == "All" else activity,
+    start_date=start_date.isoformat() if start_date else None,
+    end_date=end_date.isoformat() if end_date else None,
+)
+
+# Keyset cursors: the (start_time, id) each page starts after. Going back is
+# popping; going forward pushes the last row of the page on screen.
+if st.session_state.get("history_filters") != (filters, page_size):
+    st.session_state.history_filters = (filters, page_size)
+    st.session_state.history_cursors = [None]
+cursors = st.session_state.history_cursors
+
+# One extra row tells us whether there is an older page.
+rows = get_session_page(before=cursors[-1], limit=page_size + 1, **filters)
+has_older = len(rows) > page_size
+rows = rows[:page_size]
+
+if not rows:
+    st.info("No sessions match these filters.")
+    st.stop()
+
+# -------------------------
+# Editable page
+# -------------------------
+editor_key = f"history_{len(cursors)}_{st.session_state.get('history_saved', 0)}"
+st.data_editor(
+    [
+        {
+            "Activity": act,
+            "Start": datetime.fromisoformat(start),
+            "End": datetime.fromisoformat(end),
+            "Minutes": round(minutes, 1),
+        }
+        for _, act, start, end, minutes in rows
+    ],
+    key=editor_key,
+    num_rows="delete",
+    hide_index=True,
+    disabled=["Minutes"],
+    column_config={
+        "Activity": st.column_config.TextColumn("Activity", required=True),
+        "Start": st.column_config.DatetimeColumn("Start", format="YYYY-MM-DD HH:mm:ss", required=True),
+        "End": st.column_config.DatetimeColumn("End", format="YYYY-MM-DD HH:mm:ss", required=True),
+        "Minutes": st.column_config.NumberColumn("Minutes (recomputed)"),
+    },
+)
+
+# Map the editor's diff (row positions) back to session ids.
+changes = st.session_state.get(editor_key) or {}
+
+
+def _when(value, fallback: str) -> datetime:
+    # Edited datetimes come back as ISO strings (sometimes with millis / Z).
+    value = value or fallback
+    return datetime.fromisoformat(str(value).replace("Z", "")).replace(microsecond=0)
+
+
+edited = []
+for i, change in changes.get("edited_rows", {}).items():
+    session_id, act, start, end, _ = rows[int(i)]
+    edited.append((
+        session_id,
+        change.get("Activity", act),
+        _when(change.get("Start"), start),
+        _when(change.get("End"), end),
+    ))
+deleted = [rows[int(i)][0] for i in changes.get("deleted_rows", [])]
+pending = len(edited) + len(deleted)
+
+nav1, nav2, nav3 = st.columns([1, 1, 2])
+with nav1:
+    if st.button("⬅️ Newer", disabled=len(cursors) == 1):
+        cursors.pop()
+        st.rerun()
+with nav2:
+    if st.button("Older ➡️", disabled=not has_older):
+        last = rows[-1]
+        cursors.append((last[2], last[0]))
+        st.rerun()
+with nav3:
+    st.caption(f"Page {len(cursors)} · {len(rows)} sessions")
+
+if st.button(f"💾 Save {pending} change(s)", type="primary", disabled=not pending):
+    try:
+        apply_session_changes(edited=edited, deleted=deleted)
+    except ValueError as e:
+        st.error(f"Nothing saved: {e}.")
+    else:
+        st.session_state.history_saved = st.session_state.get("history_saved", 0) + 1
+        st.toast(f"Saved {pending} change(s)", icon="💾")
+        st.rerun()
@@ -0,0 +1,27 @@
+"""
+Lazy imports for heavy dependencies (pandas, openai, reportlab, ...),
+with first-import timing so cold-start cost stays visible.
+"""
+import importlib
+import logging
+import sys
+import time
+
+# module name -> ms spent on its first import in this process
+IMPORT_TIMES = {}
+
+_log = logging.getLogger("lazy_genius.perf")
+
+
+def lazy_import(name: str):
+    """Import `name` on first use; later calls are a dict lookup."""
+    mod = sys.modules.get(name)
+    if mod is not None:
+        return mod
+
+    t = time.perf_counter()
+    mod = importlib.import_module(name)
+    ms = (time.perf_counter() - t) * 1000
+    IMPORT_TIMES[name] = ms
+    _log.info("import %s: %.1f ms", name, ms)
+    return mod
@@ -0,0 +1,361 @@
+"""
+Quiz Mode helpers that keep SQLite off the click-to-question path.
+
+Questions are drawn by an adaptive weighted sampler (missed, rarely tried
+and stale questions come up more often). QuestionPrefetcher holds the next
+few questions (header + answer) for one topic filter, refilled by a
+background thread. Deck batches a set of questions and writes all their
+results in one transaction. Both live in the browser session's
+st.session_state.
+"""
+import queue
+import random
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from datetime import date
+
+import db
+
+# Questions kept ready ahead of the one on screen.
+PREFETCH_SIZE = 5
+
+# Seconds without a next() before the worker thread exits (sessions that
+# were closed stop holding a thread; next() starts a new one if needed).
+IDLE_TIMEOUT = 600.0
+
+# Sampling weights: each wrong answer counts this many times a right one,
+# never-tried questions get NEW_BOOST, and a question's weight ramps up to
+# 2x as it goes STALE_DAYS without being answered.
+WRONG_WEIGHT = 2.0
+NEW_BOOST = 2.0
+STALE_DAYS = 30
+
+# Samplers kept in memory per DB file (one per topic filter), LRU; files are
+# capped at db.MAX_OPEN_DBS, so students don't evict each other's samplers.
+MAX_SAMPLERS = 16
+
+
+# -------------------------
+# Adaptive sampling
+# -------------------------
+def question_weight(correct: int, wrong: int, last_answered_at, today: date) -> float:
+    weight = (1.0 + WRONG_WEIGHT * wrong) / (1.0 + correct)
+    if correct + wrong == 0:
+        weight *= NEW_BOOST
+    if last_answered_at:
+        days = (today - date.fromisoformat(last_answered_at[:10])).days
+    else:
+        days = STALE_DAYS
+    return weight * (1.0 + min(max(days, 0), STALE_DAYS) / STALE_DAYS)
+
+
+class FenwickSampler:
+    """
+    Weighted random choice over ids backed by a Fenwick (binary indexed)
+    tree: O(n) build, O(log n) per draw and per weight change.
+    """
+
+    def __init__(self, weights: dict):
+        self.ids = list(weights)
+        self._index = {q_id: i for i, q_id in enumerate(self.ids)}
+        self._weights = [float(weights[q_id]) for q_id in self.ids]
+        n = len(self.ids)
+        self._tree = [0.0] * (n + 1)
+        for i, w in enumerate(self._weights, start=1):
+            self._tree[i] += w
+            parent = i + (i & -i)
+            if parent <= n:
+                self._tree[parent] += self._tree[i]
+        self._top = 1 << (n.bit_length() - 1) if n else 0
+
+    def __len__(self):
+        return len(self.ids)
+
+    def total(self) -> float:
+        total, i = 0.0, len(self.ids)
+        while i:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def update(self, q_id, weight: float):
+        i = self._index.get(q_id)
+        if i is None:
+            return
+        delta = weight - self._weights[i]
+        self._weights[i] = weight
+        i += 1
+        while i <= len(self.ids):
+            self._tree[i] += delta
+            i += i & -i
+
+    def draw(self, rng=random):
+        """One id with probability proportional to its weight (None if empty)."""
+        total = self.total()
+        if total <= 0:
+            return None
+        target = rng.random() * total
+        # Walk down the tree to the first prefix sum above target.
+        pos, step = 0, self._top
+        while step:
+            nxt = pos + step
+            if nxt <= len(self.ids) and self._tree[nxt] <= target:
+                pos = nxt
+                target -= self._tree[nxt]
+            step >>= 1
+        return self.ids[min(pos, len(self.ids) - 1)]
+
+    def sample(self, k: int, rng=random):
+        """Up to k distinct ids, each drawn by weight (no replacement)."""
+        picked = []
+        for _ in range(min(k, len(self.ids))):
+            q_id = self.draw(rng)
+            if q_id is None:
+                break
+            picked.append((q_id, self._weights[self._index[q_id]]))
+            self.update(q_id, 0.0)
+        for q_id, weight in picked:
+            self.update(q_id, weight)
+        return [q_id for q_id, _ in picked]
+
+
+class QuestionSampler:
+    """
+    Adaptive sampler for one DB file + topic filter. It is built from the
+    questions table once, then follows answers recorded through
+    record_answers() incrementally; any other write (or a new day, which
+    changes staleness) makes it stale and get_sampler() rebuilds it.
+    """
+
+    def __init__(self, topic: str = None):
+        self.topic = topic or None
+        self.path = db.db_path()
+        self.today = date.today()
+        # Read before the rows: a write racing the build leaves us outdated.
+        self.generation = db.table_generation("questions")
+        self._lock = threading.Lock()
+        self._counts = {}
+        weights = {}
+        for q_id, correct, wrong, last in db.get_question_weights(self.topic):
+            self._counts[q_id] = [correct or 0, wrong or 0]
+            weights[q_id] = question_weight(correct or 0, wrong or 0, last, self.today)
+        self._tree = FenwickSampler(weights)
+
+    def is_current(self) -> bool:
+        return self.generation == db.table_generation("questions") and self.today == date.today()
+
+    def draw(self):
+        with self._lock:
+            return self._tree.draw()
+
+    def sample(self, k: int):
+        with self._lock:
+            return self._tree.sample(k)
+
+    def apply(self, results, before: int, after: int):
+        """Fold answers written between generations `before` -> `after` in."""
+        with self._lock:
+            if self.generation != before:
+                return
+            for q_id, is_correct in results:
+                counts = self._counts.get(q_id)
+                if counts is None:
+                    continue
+                counts[0 if is_correct else 1] += 1
+                self._tree.update(q_id, question_weight(counts[0], counts[1], self.today.isoformat(), self.today))
+            self.generation = after
+
+
+_samplers_lock = threading.Lock()
+_samplers = OrderedDict()  # DB file -> OrderedDict of topic -> QuestionSampler
+
+
+def get_sampler(topic: str = None) -> QuestionSampler:
+    """Shared, up-to-date sampler for the current user's `topic` filter."""
+    path, key = db.db_path(), topic or None
+    with _samplers_lock:
+        sampler = _samplers.get(path, {}).get(key)
+        if sampler is not None and sampler.is_current():
+            _samplers[path].move_to_end(key)
+            _samplers.move_to_end(path)
+            return sampler
+
+    sampler = QuestionSampler(topic)
+    with _samplers_lock:
+        topics = _samplers.get(path)
+        if topics is None:
+            topics = _samplers[path] = OrderedDict()
+        _samplers.move_to_end(path)
+        while len(_samplers) > db.MAX_OPEN_DBS:
+            _samplers.popitem(last=False)
+        topics[key] = sampler
+        topics.move_to_end(key)
+        while len(topics) > MAX_SAMPLERS:
+            topics.popitem(last=False)
+    return sampler
+
+
+def record_answers(results):
+    """
+    db.mark_answers() plus an O(log n) update of this DB's cached samplers,
+    so answering doesn't force a rebuild.
+    """
+    results = list(results)
+    before = db.table_generation("questions")
+    db.mark_answers(results)
+    after = db.table_generation("questions")
+    if after != before + 1:
+        return  # someone else wrote too; samplers will rebuild
+
+    path = db.db_path()
+    with _samplers_lock:
+        samplers = list(_samplers.get(path, {}).values())
+    for sampler in samplers:
+        sampler.apply(results, before, after)
+
+
+# -------------------------
+# Prefetch
+# -------------------------
+
+class QuestionPrefetcher:
+    """
+    Background-filled queue of (header, answer) for one user and topic.
+    Queued cards are tagged with the "questions" generation they were read
+    at; any write (an answer, notes retiring questions) outdates them.
+    """
+
+    def __init__(self, topic: str = None, size: int = PREFETCH_SIZE):
+        self.topic = topic or None
+        # Captured here: the worker thread doesn't inherit the script's context.
+        self.user = db.current_user()
+        self._queue = queue.Queue(maxsize=size)
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._last_used = time.monotonic()
+        self._ensure_worker()
+
+    def matches(self, topic: str = None) -> bool:
+        """True if this prefetcher serves `topic` for the current user."""
+        return self.topic == (topic or None) and self.user == db.current_user()
+
+    def next(self):
+        """Next question as (header, answer), or None if there are no questions."""
+        self._last_used = time.monotonic()
+        with db.user_context(self.user):
+            generation = db.table_generation("questions")
+            while True:
+                try:
+                    queued_at, item = self._queue.get_nowait()
+                except queue.Empty:
+                    # Cold start (or the worker fell behind): load it inline.
+                    item = self._load_one()
+                    break
+                if queued_at == generation:
+                    break
+        self._ensure_worker()
+        return item
+
+    def close(self):
+        """Stop the worker and drop anything queued."""
+        self._stop.set()
+        self._drain()
+
+    def _drain(self):
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+
+    def _load_one(self):
+        q_id = get_sampler(self.topic).draw()
+        if q_id is None:
+            return None
+        cards = db.get_cards([q_id])
+        return cards[0] if cards else None
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._stop.is_set() or (self._thread and self._thread.is_alive()):
+                return
+            self._thread = threading.Thread(target=self._run, name="quiz-prefetch", daemon=True)
+            self._thread.start()
+
+    def _idle(self) -> bool:
+        return time.monotonic() - self._last_used > IDLE_TIMEOUT
+
+    def _run(self):
+        with db.user_context(self.user):
+            while not self._stop.is_set() and not self._idle():
+                generation = db.table_generation("questions")
+                item = self._load_one()
+                if item is None:
+                    return  # nothing to quiz on; next() restarts us
+                # Wait for room, checking now and then whether to give up or
+                # whether a write made the queue (and this card) stale.
+                while not self._stop.is_set():
+                    try:
+                        self._queue.put((generation, item), timeout=1.0)
+                        break
+                    except queue.Full:
+                        if self._idle():
+                            return
+                        if db.table_generation("questions") != generation:
+                            self._drain()
+                            break
+
+
+# -------------------------
+# Decks
+# -------------------------
+def _flush_results(user, results):
+    with db.user_context(user):
+        record_answers(results)
+    results.clear()
+
+
+class Deck:
+    """
+    A batch of questions answered in one go. Results stay in memory and are
+    written with one commit when the deck ends, or when the session holding
+    it is dropped / the process exits (weakref.finalize).
+    """
+
+    def __init__(self, topic: str = None, size: int = 20):
+        self.topic = topic or None
+        self.user = db.current_user()
+        self.cards = db.get_cards(get_sampler(self.topic).sample(size))
+        self.pos = 0
+        self.correct = 0
+        self.missed = []  # headers of cards answered wrong
+        self._results = []  # (q_id, is_correct) not written yet
+        # Must not reference self, or the deck would never be collected.
+        self._flush = weakref.finalize(self, _flush_results, self.user, self._results)
+
+    @property
+    def done(self) -> bool:
+        return self.pos >= len(self.cards)
+
+    def current(self):
+        """(header, answer) of the card on screen, or None when finished."""
+        return None if self.done else self.cards[self.pos]
+
+    def answer(self, is_correct: bool):
+        header, _ = self.cards[self.pos]
+        self._results.append((header[0], is_correct))
+        if is_correct:
+            self.correct += 1
+        else:
+            self.missed.append(header)
+        self.pos += 1
+        if self.done:
+            self.finish()
+
+    def finish(self):
+        """End the deck now and write its results (only the first call writes)."""
+        self.cards = self.cards[:self.pos]
+        self._flush()
@@ -0,0 +1,205 @@
+"""
+Local "related questions" and concept clustering over a sparse TF-IDF
+index of question + answer text (NumPy/SciPy, no external service).
+
+One index per DB file lives in memory. It is built on first use and then
+kept current cheaply: new questions (ids only grow) are tokenized and
+appended; a delete, or the bank growing past REWEIGHT_GROWTH since IDF was
+last computed, triggers a rebuild / re-weighting.
+"""
+import re
+import threading
+from collections import Counter, OrderedDict
+
+import db
+from nlp import tokenize
+from perf import lazy_import
+
+# Re-compute IDF for every row once the bank grew this much since last time.
+REWEIGHT_GROWTH = 1.2
+
+# Indexes kept in memory (one per DB file), LRU; as many as there are open
+# DB files, so active students don't keep rebuilding each other's index.
+MAX_INDEXES = db.MAX_OPEN_DBS
+
+# Section labels every generated answer has ("Core answer:", "Memory hook:").
+_HEADING_RE = re.compile(r"^\s*[a-z][a-z /]{2,30}:", re.I | re.M)
+
+
+def _np():
+    return lazy_import("numpy")
+
+
+def _sparse():
+    return lazy_import("scipy.sparse")
+
+
+class RelatedIndex:
+    """Row-normalized TF-IDF matrix of every question in one DB file."""
+
+    def __init__(self):
+        self.path = db.db_path()
+        self.generation = None
+        self.ids = []       # row -> question id
+        self.topics = []    # row -> topic name
+        self.rows = {}      # question id -> row
+        self.vocab = {}     # term -> column
+        self.max_id = 0
+        self._lock = threading.Lock()
+        self._tf = None      # raw sublinear tf, CSR (rows x vocab)
+        self._df = None      # document frequency per column
+        self._weighted_n = 0  # rows when IDF was last applied to everything
+        self.matrix = None   # normalized TF-IDF, CSR
+
+    def __len__(self):
+        return len(self.ids)
+
+    # -------------------------
+    # Building / keeping current
+    # -------------------------
+    def refresh(self):
+        """Catch up with writes since the last call (no-op if none)."""
+        with self._lock:
+            generation = db.table_generation("questions")
+            if generation == self.generation:
+                return
+            count = db.get_question_count()
+            new = list(db.iter_question_texts(after_id=self.max_id))
+            if self.matrix is None or len(self.ids) + len(new) != count:
+                # First use, or something was deleted: start over.
+                self._reset()
+                new = list(db.iter_question_texts())
+            self._append(new)
+            self.generation = generation
+
+    def _reset(self):
+        np, sparse = _np(), _sparse()
+        self.ids, self.topics, self.rows, self.vocab, self.max_id = [], [], {}, {}, 0
+        self._tf = sparse.csr_matrix((0, 0), dtype=np.float64)
+        self._df = np.zeros(0)
+        self._weighted_n = 0
+        self.matrix = self._tf.copy()
+
+    def _append(self, docs):
+        if not docs:
+            return
+        np, sparse = _np(), _sparse()
+
+        data, cols, indptr = [], [], [0]
+        for q_id, topic, question, answer in docs:
+            counts = {}
+            for term in tokenize(f"{question}\n{_HEADING_RE.sub(' ', answer or '')}"):
+                col = self.vocab.setdefault(term, len(self.vocab))
+                counts[col] = counts.get(col, 0) + 1
+            cols.extend(counts)
+            data.extend(counts.values())
+            indptr.append(len(cols))
+            self.rows[q_id] = len(self.ids)
+            self.ids.append(q_id)
+            self.topics.append(topic)
+            self.max_id = max(self.max_id, q_id)
+
+        width = len(self.vocab)
+        data = 1.0 + np.log(np.asarray(data, dtype=np.float64))  # sublinear tf
+        new_tf = sparse.csr_matrix((data, cols, indptr), shape=(len(docs), width))
+        self._tf.resize((self._tf.shape[0], width))
+        self.matrix.resize((self.matrix.shape[0], width))
+        self._tf = sparse.vstack([self._tf, new_tf], format="csr")
+
+        df = np.zeros(width)
+        df[:len(self._df)] = self._df
+        df += np.bincount(new_tf.indices, minlength=width)
+        self._df = df
+
+        if len(self.ids) > self._weighted_n * REWEIGHT_GROWTH:
+            self.matrix = self._weigh(self._tf)
+            self._weighted_n = len(self.ids)
+        else:
+            self.matrix = sparse.vstack([self.matrix, self._weigh(new_tf)], format="csr")
+
+    def _weigh(self, tf):
+        """TF-IDF with the current document frequencies, rows L2-normalized."""
+        np, sparse = _np(), _sparse()
+        idf = np.log((1 + len(self.ids)) / (1 + self._df)) + 1.0
+        weighted = tf @ sparse.diags(idf)
+        norms = np.sqrt(weighted.multiply(weighted).sum(axis=1)).A1
+        norms[norms == 0] = 1.0
+        return (sparse.diags(1.0 / norms) @ weighted).tocsr()
+
+    # -------------------------
+    # Queries
+    # -------------------------
+    def related(self, q_id: int, k: int = 5):
+        """Top-k most similar questions to `q_id` as [(question id, cosine)]."""
+        np = _np()
+        with self._lock:
+            row = self.rows.get(q_id)
+            if row is None or len(self.ids) < 2:
+                return []
+            # CSR times a dense vector is scipy's fastest sparse product.
+            scores = self.matrix @ self.matrix[row].toarray().ravel()
+            ids = self.ids
+        scores[row] = -1.0
+        k = min(k, len(scores) - 1)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(ids[i], float(scores[i])) for i in top if scores[i] > 0]
+
+    def clusters(self, k: int = 8, iters: int = 20, seed: int = 0, n_terms: int = 5):
+        """
+        Spherical k-means over the index. Returns clusters biggest first as
+        [{"terms": [top terms], "ids": [question ids], "topics": Counter}].
+        """
+        np, sparse = _np(), _sparse()
+        with self._lock:
+            X, ids, topics, vocab = self.matrix, list(self.ids), list(self.topics), dict(self.vocab)
+        n = X.shape[0]
+        k = min(k, n)
+        if k == 0:
+            return []
+
+        rng = np.random.default_rng(seed)
+        centers = X[rng.choice(n, k, replace=False)].toarray()
+        labels = None
+        for _ in range(iters):
+            new_labels = np.asarray(X @ centers.T).argmax(axis=1)
+            if labels is not None and np.array_equal(new_labels, labels):
+                break
+            labels = new_labels
+            members = sparse.csr_matrix((np.ones(n), (labels, np.arange(n))), shape=(k, n))
+            sums = np.asarray((members @ X).todense())
+            norms = np.linalg.norm(sums, axis=1)
+            filled = norms > 0  # empty clusters keep their old center
+            centers[filled] = sums[filled] / norms[filled, None]
+
+        terms = np.empty(len(vocab), dtype=object)
+        for term, col in vocab.items():
+            terms[col] = term
+        out = []
+        for j in range(k):
+            rows = np.flatnonzero(labels == j)
+            if len(rows):
+                top = np.argsort(-centers[j])[:n_terms]
+                out.append({"terms": [terms[c] for c in top if centers[j][c] > 0],
+                            "ids": [ids[r] for r in rows],
+                            "topics": Counter(topics[r] for r in rows)})
+        out.sort(key=lambda c: -len(c["ids"]))
+        return out
+
+
+_indexes_lock = threading.Lock()
+_indexes = OrderedDict()  # DB file -> RelatedIndex
+
+
+def get_index() -> RelatedIndex:
+    """The current user's index, caught up with any writes."""
+    path = db.db_path()
+    with _indexes_lock:
+        index = _indexes.get(path)
+        if index is None:
+            index = _indexes[path] = RelatedIndex()
+        _indexes.move_to_end(path)
+        while len(_indexes) > MAX_INDEXES:
+            _indexes.popitem(last=False)
+    index.refresh()
+    return index
@@ -0,0 +1,21 @@
+import json
+
+from bench import run
+
+
+def test_cases_without_a_budget_fail():
+    results = {"get_todos": {"cold_ms": 0.1}, "new_case": {"cold_ms": 0.1}}
+    budgets = {"get_todos": 1.0, "gone_case": 1.0}
+
+    failures = run.check(results, budgets, require_budgets=True)
+
+    assert failures == [
+        "new_case: no budget in thresholds.json",
+        "gone_case: budget for a case that no longer exists",
+    ]
+
+
+def test_every_case_has_a_budget_in_every_preset():
+    names = set(run.read_cases()) | set(run.write_cases())
+    for preset, budgets in json.loads(run.THRESHOLDS_FILE.read_text()).items():
+        assert set(budgets) == names, preset
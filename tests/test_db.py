@@ -0,0 +1,108 @@
+import os
+import sqlite3
+
+import db
+
+
+def _legacy_tasks(rows):
+    conn = sqlite3.connect(db.LEGACY_TASKS_DB)
+    conn.execute("""
+        CREATE TABLE daily_tasks (
+            id INTEGER PRIMARY KEY, task_date TEXT, task_text TEXT,
+            is_done INTEGER, created_at TEXT
+        )
+    """)
+    conn.executemany(
+        "INSERT INTO daily_tasks (task_date, task_text, is_done, created_at) VALUES (?, ?, ?, ?)",
+        rows,
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_legacy_tasks_only_land_in_the_default_db(fresh_db):
+    _legacy_tasks([("2026-01-01", "read", 1, "2026-01-01 08:00:00"), ("2026-01-02", "anki", 0, None)])
+
+    db.init_db()
+    assert [r[1] for r in db.iter_rows("todos")] == ["read", "anki"]
+
+    db.set_user("alice")
+    db.init_db()
+    assert list(db.iter_rows("todos")) == []
+
+
+def test_repeated_paragraphs_stay_in_the_saved_note(fresh_db):
+    db.init_db()
+    text = "Intro.\n\nKey fact.\n\nDetails.\n\nKey fact."
+
+    new, _ = db.diff_note("bio", text)
+    assert [p for _, p in new] == ["Intro.", "Key fact.", "Details."]
+
+    db.save_note("bio", text)
+    assert db.get_note("bio") == text
+
+
+def test_paragraphs_without_questions_stay_pending(fresh_db):
+    db.init_db()
+    text = "Heading\n\nThe heart has four chambers."
+    new, _ = db.diff_note("bio", text)
+
+    db.save_note("bio", text, [(new[1][0], "Short Answer", "How many chambers?", "Four")])
+
+    new, _ = db.diff_note("bio", text)
+    assert [p for _, p in new] == ["Heading"]
+
+
+def test_todos_default_to_the_current_day(fresh_db, monkeypatch):
+    import datetime as dt
+
+    class FakeDate(dt.date):
+        today_value = dt.date(2026, 10, 1)
+
+        @classmethod
+        def today(cls):
+            return cls.today_value
+
+    db.init_db()
+    monkeypatch.setattr(db, "date", FakeDate)
+    db.apply_todo_changes("2026-10-01", added=[("old", False)])
+    assert [t for _, t, _ in db.get_todos()] == ["old"]
+    assert db.count_open_todos_before() == 0
+
+    FakeDate.today_value = dt.date(2026, 10, 2)  # midnight passes, nothing is written
+    assert db.get_todos() == []
+    assert db.count_open_todos_before() == 1
+
+
+def test_cached_reads_see_writes_from_other_processes(fresh_db):
+    import subprocess
+    import sys
+
+    db.init_db()
+    db.apply_todo_changes("2026-10-01", added=[("mine", False)])
+    assert [t for _, t, _ in db.get_todos("2026-10-01")] == ["mine"]
+
+    # What `python transfer.py import todos ...` does while the app runs.
+    subprocess.run([sys.executable, "-c", (
+        "import db; db.DB_NAME = {!r}; "
+        "db.apply_todo_changes('2026-10-01', added=[('theirs', False)])"
+    ).format(db.DB_NAME)], check=True, cwd=os.path.dirname(os.path.abspath(db.__file__)))
+
+    assert [t for _, t, _ in db.get_todos("2026-10-01")] == ["theirs", "mine"]
+
+
+def test_one_students_reads_dont_evict_anothers(fresh_db):
+    db.set_user("alice")
+    db.get_todos("2026-10-01")
+
+    db.set_user("bob")
+    for day in range(1, db.CACHE_SIZE + 2):
+        db.get_todos(f"2026-{day // 28 + 1:02d}-{day % 28 + 1:02d}")
+
+    db.set_user("alice")
+    stats = db.start_query_stats()
+    try:
+        db.get_todos("2026-10-01")
+    finally:
+        db.stop_query_stats()
+    assert stats.cache_hits == 1
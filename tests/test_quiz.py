@@ -0,0 +1,26 @@
+import time
+
+import db
+import quiz
+
+
+def _wait_full(prefetch, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not prefetch._queue.full() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_prefetched_cards_are_dropped_after_a_write(fresh_db):
+    db.init_db()
+    db.add_question("bio", "MCQ", "How many chambers?", "Four")
+    prefetch = quiz.QuestionPrefetcher()
+    try:
+        _wait_full(prefetch)
+        (q_id, *_), _ = prefetch.next()
+
+        db.mark_answer(q_id, True)
+
+        (_, _, _, _, _, correct, wrong), _ = prefetch.next()
+        assert (correct, wrong) == (1, 0)
+    finally:
+        prefetch.close()
@@ -0,0 +1,68 @@
+import csv
+import io
+import json
+
+import pytest
+
+import db
+import transfer
+
+
+def _session(day):
+    return {"activity": "Anki", "start_time": f"{day}T09:00:00", "end_time": f"{day}T09:30:00"}
+
+
+def test_bad_ndjson_line_skips_only_itself(fresh_db):
+    lines = [
+        json.dumps(_session("2026-10-01")) + "\n",
+        '{"activity": "Anki", broken\n',
+        json.dumps(_session("2026-10-02")) + "\n",
+    ]
+
+    report = transfer.import_table("sessions", lines, "ndjson")
+
+    assert report["imported"] == 2
+    assert report["skipped"] == 1
+    assert [n for n, _ in report["errors"]] == [2]
+    assert [r[1][:10] for r in db.iter_rows("sessions")] == ["2026-10-01", "2026-10-02"]
+
+
+def test_unreadable_csv_row_skips_only_itself(fresh_db):
+    limit = csv.field_size_limit(40)  # makes the long row a csv.Error
+    try:
+        text = (
+            "activity,start_time,end_time\n"
+            "Anki,2026-10-01T09:00:00,2026-10-01T09:30:00\n"
+            + "x" * 100 + ",a,b\n"
+            "Anki,2026-10-02T09:00:00,2026-10-02T09:30:00\n"
+        )
+        report = transfer.import_table("sessions", io.StringIO(text), "csv")
+    finally:
+        csv.field_size_limit(limit)
+
+    assert report["imported"] == 2
+    assert report["skipped"] == 1
+    assert [n for n, _ in report["errors"]] == [3]
+
+
+@pytest.mark.parametrize("count", ["inf", "1e400", "-nan", str(2**70)])
+def test_out_of_range_count_skips_only_its_row(fresh_db, count):
+    text = (
+        "topic,q_type,question,answer,correct_count\n"
+        "bio,MCQ,Q1?,A1,1\n"
+        f"bio,MCQ,Q2?,A2,{count}\n"
+        "bio,MCQ,Q3?,A3,2\n"
+    )
+    report = transfer.import_table("questions", io.StringIO(text), "csv")
+
+    assert report["imported"] == 2
+    assert [n for n, _ in report["errors"]] == [3]
+
+
+def test_bom_prefixed_csv_file(fresh_db, capsys):
+    path = "sessions.csv"
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        f.write("activity,start_time,end_time\nAnki,2026-10-01T09:00:00,2026-10-01T09:30:00\n")
+
+    assert transfer.main(["import", "sessions", path]) == 0
+    assert "Imported 1 rows, skipped 0." in capsys.readouterr().err
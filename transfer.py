@@ -0,0 +1,265 @@
+"""
+Bulk import / export of sessions, questions, todos and settings.
+
+Everything streams: export reads straight off a cursor, import parses and
+validates one record at a time and hands db.insert_many a generator, so
+memory stays flat no matter how big the file is.
+
+    python transfer.py export sessions -o sessions.ndjson
+    python transfer.py import sessions sessions.csv
+    python transfer.py --user marcia export questions -o marcia.csv
+"""
+import argparse
+import csv
+import io
+import json
+import math
+import sys
+from datetime import date, datetime
+
+from db import TABLE_COLUMNS, insert_many, iter_rows, set_user
+
+FORMATS = ["csv", "ndjson"]
+Q_TYPES = ["MCQ", "Short Answer"]
+
+# Largest value an SQLite INTEGER column can hold.
+MAX_INT = 2**63 - 1
+
+# Only the first few bad rows are kept for the report.
+MAX_ERRORS = 20
+
+
+# -------------------------
+# Export
+# -------------------------
+def export_lines(table: str, fmt: str):
+    """Yield the export file for `table` line by line (str, with newline)."""
+    cols = TABLE_COLUMNS[table]
+
+    if fmt == "ndjson":
+        for row in iter_rows(table):
+            yield json.dumps(dict(zip(cols, row)), ensure_ascii=False) + "\n"
+        return
+
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(cols)
+    for row in iter_rows(table):
+        writer.writerow(row)
+        # Flush the small buffer every row so nothing accumulates.
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    yield buf.getvalue()
+
+
+def export_table(table: str, fmt: str, out) -> None:
+    """Write the export for `table` to a text file object."""
+    for line in export_lines(table, fmt):
+        out.write(line)
+
+
+# -------------------------
+# Import
+# -------------------------
+def read_records(lines, fmt: str):
+    """
+    Yield (line number, raw record) from CSV or NDJSON text lines: a dict per
+    CSV row, the text of each non-blank NDJSON line. Nothing is parsed or
+    checked beyond that; validate() does it per record, so one bad line only
+    skips itself. A CSV row the csv module can't read comes through as its
+    csv.Error.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        while True:
+            try:
+                rec = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as e:
+                # Raised before line_num counts the offending line.
+                yield reader.line_num + 1, e
+                continue
+            yield reader.line_num, rec
+        return
+
+    for n, line in enumerate(lines, start=1):
+        line = line.strip()
+        if line:
+            yield n, line
+
+
+def _text(rec, key, required=True):
+    val = rec.get(key)
+    val = "" if val is None else str(val).strip()
+    if required and not val:
+        raise ValueError(f"missing {key}")
+    return val
+
+
+def _int(rec, key, default=0):
+    val = rec.get(key)
+    if val in (None, ""):
+        return default
+    num = float(val)
+    if not math.isfinite(num):
+        raise ValueError(f"{key} must be a finite number")
+    val = int(num)
+    if not 0 <= val <= MAX_INT:
+        raise ValueError(f"{key} must be between 0 and {MAX_INT}")
+    return val
+
+
+def _iso(val: str):
+    """Parse an ISO timestamp; return (datetime, canonical 'YYYY-MM-DDTHH:MM:SS')."""
+    dt = datetime.fromisoformat(val)
+    # Already canonical (what we export): skip re-formatting, it's the hot path.
+    if len(val) == 19 and val[10] == "T":
+        return dt, val
+    return dt, dt.isoformat(timespec="seconds")
+
+
+def _timestamp(rec, key, required=True):
+    val = _text(rec, key, required)
+    if not val:
+        return datetime.now().isoformat(timespec="seconds")
+    return _iso(val)[1]
+
+
+def _session_row(rec):
+    start, start_s = _iso(_text(rec, "start_time"))
+    end, end_s = _iso(_text(rec, "end_time"))
+    if end < start:
+        raise ValueError("end_time before start_time")
+    # Recomputed rather than trusted, same as db.save_session.
+    minutes = (end - start).total_seconds() / 60.0
+    return (_text(rec, "activity"), start_s, end_s, minutes)
+
+
+def _question_row(rec):
+    q_type = _text(rec, "q_type")
+    if q_type not in Q_TYPES:
+        raise ValueError(f"q_type must be one of {Q_TYPES}")
+    return (
+        _text(rec, "topic"),
+        q_type,
+        _text(rec, "question"),
+        _text(rec, "answer"),
+        _timestamp(rec, "created_at", required=False),
+        _int(rec, "correct_count"),
+        _int(rec, "wrong_count"),
+    )
+
+
+def _todo_row(rec):
+    done = _int(rec, "done")
+    if done not in (0, 1):
+        raise ValueError("done must be 0 or 1")
+    return (
+        date.fromisoformat(_text(rec, "todo_date")).isoformat(),
+        _text(rec, "task"),
+        done,
+        _timestamp(rec, "created_at", required=False),
+    )
+
+
+def _setting_row(rec):
+    return (_text(rec, "key"), _text(rec, "value", required=False))
+
+
+ROW_BUILDERS = {
+    "sessions": _session_row,
+    "questions": _question_row,
+    "todos": _todo_row,
+    "settings": _setting_row,
+}
+
+
+def validate(table: str, records, report: dict):
+    """
+    Turn parsed records into insert tuples, skipping bad ones.
+    `records` are (line number, raw record) pairs from read_records.
+    `report` collects {"skipped": n, "errors": [(line_no, message), ...]}.
+    """
+    build = ROW_BUILDERS[table]
+    report.setdefault("skipped", 0)
+    report.setdefault("errors", [])
+
+    for n, rec in records:
+        try:
+            if isinstance(rec, csv.Error):
+                raise ValueError(f"unreadable CSV row ({rec})")
+            if isinstance(rec, str):
+                rec = json.loads(rec)  # JSONDecodeError is a ValueError
+            if not isinstance(rec, dict):
+                raise ValueError("not an object")
+            yield build(rec)
+        except (ValueError, TypeError, OverflowError) as e:
+            report["skipped"] += 1
+            if len(report["errors"]) < MAX_ERRORS:
+                report["errors"].append((n, str(e)))
+
+
+def import_table(table: str, lines, fmt: str) -> dict:
+    """Validate and bulk-insert a CSV/NDJSON stream. Returns an import report."""
+    report = {}
+    report["imported"] = insert_many(table, validate(table, read_records(lines, fmt), report))
+    return report
+
+
+def guess_format(path: str, default: str = "csv") -> str:
+    lower = path.lower()
+    if lower.endswith((".ndjson", ".jsonl", ".json")):
+        return "ndjson"
+    if lower.endswith(".csv"):
+        return "csv"
+    return default
+
+
+# -------------------------
+# CLI
+# -------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import/export for Lazy Genius data.")
+    parser.add_argument("-u", "--user", help="student id (default: the single-student DB)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    ex = sub.add_parser("export", help="write a table to CSV/NDJSON")
+    ex.add_argument("table", choices=list(TABLE_COLUMNS))
+    ex.add_argument("-o", "--output", help="file to write (default: stdout)")
+    ex.add_argument("-f", "--format", choices=FORMATS)
+
+    im = sub.add_parser("import", help="load a CSV/NDJSON file into a table")
+    im.add_argument("table", choices=list(TABLE_COLUMNS))
+    im.add_argument("input", help="file to read ('-' for stdin)")
+    im.add_argument("-f", "--format", choices=FORMATS)
+
+    args = parser.parse_args(argv)
+    set_user(args.user)
+
+    if args.command == "export":
+        fmt = args.format or guess_format(args.output or "", default="ndjson")
+        if args.output:
+            with open(args.output, "w", encoding="utf-8", newline="") as out:
+                export_table(args.table, fmt, out)
+        else:
+            export_table(args.table, fmt, sys.stdout)
+        return 0
+
+    fmt = args.format or guess_format(args.input)
+    if args.input == "-":
+        report = import_table(args.table, sys.stdin, fmt)
+    else:
+        # utf-8-sig drops the BOM spreadsheet apps put in front of the header.
+        with open(args.input, encoding="utf-8-sig", newline="") as f:
+            report = import_table(args.table, f, fmt)
+
+    print(f"Imported {report['imported']} rows, skipped {report['skipped']}.", file=sys.stderr)
+    for n, msg in report["errors"]:
+        print(f"  line {n}: {msg}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,13 +2,92 @@ import base64
 from pathlib import Path
 import streamlit as st
 
+import db
+from perf import IMPORT_TIMES
+
 def _img_to_base64(path: str) -> str:
     p = Path(path)
     if not p.exists():
         return ""
     return base64.b64encode(p.read_bytes()).decode()
 
-def apply_girly_theme():
+def bind_user():
+    """
+    Point db at the student using this browser session. Call before any db call.
+    The id comes from the sidebar box (prefilled from ?user=<id>); empty means
+    the original single-student database.
+    """
+    if "_user" not in st.session_state:
+        st.session_state["_user"] = st.query_params.get("user", "")
+
+    entered = st.sidebar.text_input(
+        "👤 Student ID", value=st.session_state["_user"], placeholder="e.g. marcia",
+    )
+    try:
+        db.set_user(entered)
+    except ValueError as e:
+        st.sidebar.error(str(e))
+        st.stop()
+
+    user = db.current_user() or ""
+    st.session_state["_user"] = user
+    if user:
+        st.query_params["user"] = user
+    elif "user" in st.query_params:
+        del st.query_params["user"]
+
+
+def query_diagnostics():
+    """
+    Hidden SQL diagnostics panel (sidebar), shown only with ?debug=1 in the URL.
+    Shows what the PREVIOUS rerun ran, so pages that st.stop() early still count.
+    """
+    db.stop_query_stats()
+    if st.query_params.get("debug") != "1":
+        return
+
+    prev = st.session_state.get("_query_stats")
+    try:
+        if IMPORT_TIMES:
+            with st.sidebar.expander("⏱️ Lazy imports (first load)"):
+                st.dataframe(
+                    [{"module": m, "ms": round(ms, 1)} for m, ms in IMPORT_TIMES.items()],
+                    use_container_width=True, hide_index=True,
+                )
+
+        with st.sidebar.expander("🔍 Query stats (last rerun)"):
+            if prev is None:
+                st.caption("Interact with the page to collect a rerun.")
+                return
+
+            st.caption(
+                f"{len(prev.records)} queries · {prev.total_ms:.1f} ms · "
+                f"{prev.engine_statements} SQLite statements "
+                f"({prev.trigger_statements} in triggers) · "
+                f"cache {prev.cache_hits} hits / {prev.cache_misses} misses"
+            )
+
+            rows = prev.summary()
+            for r in rows:
+                if r["sql"].upper().startswith(("SELECT", "WITH")):
+                    plan = db.explain(r["sql"])
+                    # SCAN without an index = reads the whole table.
+                    r["full_scan"] = any(p.startswith("SCAN") and "INDEX" not in p for p in plan)
+                    r["plan"] = " | ".join(plan)
+                r["total_ms"] = round(r["total_ms"], 2)
+                r["max_ms"] = round(r["max_ms"], 2)
+                # Same statement many times in one rerun smells like N+1.
+                r["n_plus_1"] = r["calls"] >= 10
+
+            st.dataframe(rows, use_container_width=True, hide_index=True)
+    finally:
+        # Start collecting after our own EXPLAINs, for the rest of this rerun.
+        st.session_state["_query_stats"] = db.start_query_stats()
+
+
+@st.cache_resource
+def _theme_css() -> str:
+    """The full theme <style> block, built once per process (reads + encodes the bg image)."""
     # Load local background (optional)
     bg_b64 = _img_to_base64("assets/teddy_bg.png")
     bg_css = ""
@@ -25,9 +104,7 @@ def apply_girly_theme():
 }}
 """
 
-
-    st.markdown(
-        f"""
+    return f"""
         <style>
         /* Import cute fonts */
         @import url('https://fonts.googleapis.com/css2?family=Quicksand:wght@400;600;700&family=Pacifico&display=swap');
@@ -111,6 +188,10 @@ def apply_girly_theme():
             animation: sparkle 2s infinite;
         }}
         </style>
-        """,
-        unsafe_allow_html=True,
-    )
+        """
+
+
+def apply_girly_theme():
+    bind_user()
+    query_diagnostics()
+    st.markdown(_theme_css(), unsafe_allow_html=True)